@@ -0,0 +1,33 @@
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'n1a2b3c4d5e6'
+down_revision: Union[str, Sequence[str], None] = ('923952692b61', 'm9n0o1p2q3r4')
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Make frame_tracking one-row-per-user and index latest section data lookups."""
+    op.execute("""
+        DELETE FROM frame_tracking ft
+        USING frame_tracking newer
+        WHERE ft.user_id = newer.user_id AND ft.id < newer.id
+    """)
+    op.execute("DROP INDEX IF EXISTS ix_frame_tracking_user_id")
+    op.execute("CREATE UNIQUE INDEX IF NOT EXISTS ix_frame_tracking_user_id ON frame_tracking (user_id)")
+
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_profile_section_data_user_section_created "
+        "ON profile_section_data (user_id, section_id, created_at)"
+    )
+
+
+def downgrade() -> None:
+    """Revert frame_tracking user_id index to non-unique."""
+    op.execute("DROP INDEX IF EXISTS ix_profile_section_data_user_section_created")
+    op.execute("DROP INDEX IF EXISTS ix_frame_tracking_user_id")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_frame_tracking_user_id ON frame_tracking (user_id)")
@@ -0,0 +1,25 @@
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'o2b3c4d5e6f7'
+down_revision: Union[str, Sequence[str], None] = 'n1a2b3c4d5e6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add (user_id, id) index for last-N / keyset message reads."""
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_messages_user_id_id "
+            "ON messages (user_id, id)"
+        )
+
+
+def downgrade() -> None:
+    """Drop messages (user_id, id) index."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_messages_user_id_id")
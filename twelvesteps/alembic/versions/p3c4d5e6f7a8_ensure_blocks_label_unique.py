@@ -0,0 +1,39 @@
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'p3c4d5e6f7a8'
+down_revision: Union[str, Sequence[str], None] = 'o2b3c4d5e6f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Ensure blocks.label is backed by a unique index (needed for ON CONFLICT upserts)."""
+    from sqlalchemy import inspect
+
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    if 'blocks' not in inspector.get_table_names():
+        return
+
+    has_unique = any(
+        idx.get('unique') and idx['column_names'] == ['label']
+        for idx in inspector.get_indexes('blocks')
+    ) or any(
+        uc['column_names'] == ['label']
+        for uc in inspector.get_unique_constraints('blocks')
+    )
+    if has_unique:
+        return
+
+    with op.get_context().autocommit_block():
+        op.execute("CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ux_blocks_label ON blocks (label)")
+
+
+def downgrade() -> None:
+    """Drop the unique index created by this migration (if any)."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ux_blocks_label")
@@ -0,0 +1,53 @@
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'q4d5e6f7a8b9'
+down_revision: Union[str, Sequence[str], None] = 'p3c4d5e6f7a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add the unique keys used by ON CONFLICT upserts on qa_status, session_states and session_contexts."""
+    for table in ('qa_status', 'session_states'):
+        op.execute(f"""
+            DELETE FROM {table} t
+            USING {table} newer
+            WHERE t.user_id = newer.user_id AND t.id < newer.id
+        """)
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_user_id")
+        op.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS ix_{table}_user_id ON {table} (user_id)")
+
+    op.execute("""
+        DELETE FROM session_contexts sc
+        USING session_contexts newer
+        WHERE sc.user_id = newer.user_id
+          AND sc.session_type = newer.session_type
+          AND sc.id < newer.id
+    """)
+    # ADD CONSTRAINT has no IF NOT EXISTS; guard it so a partially applied
+    # upgrade can be re-run.
+    op.execute("""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_constraint
+                WHERE conname = 'uq_session_context_user_type'
+                  AND conrelid = 'session_contexts'::regclass
+            ) THEN
+                ALTER TABLE session_contexts
+                    ADD CONSTRAINT uq_session_context_user_type UNIQUE (user_id, session_type);
+            END IF;
+        END $$
+    """)
+
+
+def downgrade() -> None:
+    """Drop the unique keys and restore plain user_id indexes."""
+    op.execute("ALTER TABLE session_contexts DROP CONSTRAINT IF EXISTS uq_session_context_user_type")
+    for table in ('qa_status', 'session_states'):
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_user_id")
+        op.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_user_id ON {table} (user_id)")
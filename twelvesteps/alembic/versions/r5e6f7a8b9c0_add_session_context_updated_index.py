@@ -0,0 +1,23 @@
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'r5e6f7a8b9c0'
+down_revision: Union[str, Sequence[str], None] = 'q4d5e6f7a8b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add (user_id, updated_at) index for latest-context lookups."""
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_session_context_user_updated "
+        "ON session_contexts (user_id, updated_at)"
+    )
+
+
+def downgrade() -> None:
+    """Drop session_contexts (user_id, updated_at) index."""
+    op.execute("DROP INDEX IF EXISTS ix_session_context_user_updated")
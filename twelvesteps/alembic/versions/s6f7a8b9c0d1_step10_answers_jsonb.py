@@ -0,0 +1,42 @@
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 's6f7a8b9c0d1'
+down_revision: Union[str, Sequence[str], None] = 'r5e6f7a8b9c0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Store step 10 answers as a JSONB object keyed by question number."""
+    op.execute(
+        "ALTER TABLE step10_daily_analysis "
+        "ALTER COLUMN answers TYPE jsonb USING answers::jsonb"
+    )
+    op.execute("""
+        UPDATE step10_daily_analysis
+        SET answers = (
+            SELECT COALESCE(jsonb_object_agg(elem->>'question_number', elem), '{}'::jsonb)
+            FROM jsonb_array_elements(answers) AS elem
+        )
+        WHERE jsonb_typeof(answers) = 'array'
+    """)
+
+
+def downgrade() -> None:
+    """Restore step 10 answers as a JSON list ordered by question number."""
+    op.execute("""
+        UPDATE step10_daily_analysis
+        SET answers = (
+            SELECT COALESCE(jsonb_agg(value ORDER BY (key)::int), '[]'::jsonb)
+            FROM jsonb_each(answers)
+        )
+        WHERE jsonb_typeof(answers) = 'object'
+    """)
+    op.execute(
+        "ALTER TABLE step10_daily_analysis "
+        "ALTER COLUMN answers TYPE json USING answers::json"
+    )
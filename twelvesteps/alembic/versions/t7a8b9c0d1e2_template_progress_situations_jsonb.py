@@ -0,0 +1,26 @@
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 't7a8b9c0d1e2'
+down_revision: Union[str, Sequence[str], None] = 's6f7a8b9c0d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Store template_progress.situations as JSONB (for in-place jsonb_set writes)."""
+    op.execute(
+        "ALTER TABLE template_progress "
+        "ALTER COLUMN situations TYPE jsonb USING situations::jsonb"
+    )
+
+
+def downgrade() -> None:
+    """Revert template_progress.situations to JSON."""
+    op.execute(
+        "ALTER TABLE template_progress "
+        "ALTER COLUMN situations TYPE json USING situations::json"
+    )
@@ -0,0 +1,23 @@
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'u8b9c0d1e2f3'
+down_revision: Union[str, Sequence[str], None] = 't7a8b9c0d1e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add (user_id, step_id, question_id, status) index for active-progress lookups."""
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_template_progress_user_step_q_status "
+        "ON template_progress (user_id, step_id, question_id, status)"
+    )
+
+
+def downgrade() -> None:
+    """Drop template_progress active-progress index."""
+    op.execute("DROP INDEX IF EXISTS ix_template_progress_user_step_q_status")
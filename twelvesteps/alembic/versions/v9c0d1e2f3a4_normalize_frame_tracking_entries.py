@@ -0,0 +1,40 @@
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'v9c0d1e2f3a4'
+down_revision: Union[str, Sequence[str], None] = 'u8b9c0d1e2f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Rewrite frame_tracking confirmed/candidates entries to {"content": ...} objects."""
+    for column in ("confirmed", "candidates"):
+        op.execute(f"""
+            UPDATE frame_tracking SET {column} = (
+                SELECT json_agg(
+                    CASE
+                        WHEN json_typeof(e) <> 'object'
+                            THEN json_build_object('content', coalesce(e #>> '{{}}', ''))
+                        WHEN NOT (e::jsonb ? 'content')
+                            THEN (e::jsonb || '{{"content": ""}}'::jsonb)::json
+                        ELSE e
+                    END
+                    ORDER BY i
+                )
+                FROM json_array_elements({column}) WITH ORDINALITY AS t(e, i)
+            )
+            WHERE json_typeof({column}) = 'array'
+              AND EXISTS (
+                SELECT 1 FROM json_array_elements({column}) AS x(e)
+                WHERE json_typeof(e) <> 'object' OR NOT (e::jsonb ? 'content')
+              )
+        """)
+
+
+def downgrade() -> None:
+    """Data-only normalization; the previous shapes are still readable, nothing to undo."""
+    pass
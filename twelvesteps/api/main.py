@@ -120,6 +120,18 @@ async def startup_event():
         print(f"⚠️ Warning: Could not initialize profile sections on startup: {e}")
         import traceback
         traceback.print_exc()
+    try:
+        from repositories.PromptRepository import PromptRepository
+        await PromptRepository.preload_all()
+        print("✅ Prompts preloaded")
+    except Exception as e:
+        print(f"⚠️ Warning: Could not preload prompts on startup: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Finish queued personalized prompt rebuilds before the process exits"""
+    from services.personalization_service import drain_personalization_refreshes
+    await drain_personalization_refreshes()
 
 def build_user_schema(user) -> UserSchema:
     """Build UserSchema from User model."""
@@ -736,8 +748,8 @@ async def get_profile_sections(
         logger = logging.getLogger(__name__)
         logger.info(f"Returning {len(sections)} sections for user {current_user.user.id}")
         for section in sections:
-            questions_count = len(section.questions) if hasattr(section, 'questions') and section.questions else 0
-            logger.info(f"Section {section.id}: {section.name}, questions count: {questions_count}")
+            questions_count = len(section["questions"])
+            logger.info(f"Section {section['id']}: {section['name']}, questions count: {questions_count}")
 
         return ProfileSectionListResponse(sections=sections)
     except Exception as e:
@@ -1767,7 +1779,7 @@ async def start_template_progress(
     payload: TemplateProgressStartRequest,
     current_context: CurrentUserContext = Depends(get_current_user)
 ) -> TemplateProgressResponse:
-    """
+    """Start or resume filling the answer template for a question."""
     service = TemplateService(current_context.session)
     result = await service.start_template_filling(
         user_id=current_context.user.id,
@@ -1797,7 +1809,7 @@ async def submit_template_field(
     payload: TemplateFieldSubmitRequest,
     current_context: CurrentUserContext = Depends(get_current_user)
 ) -> TemplateFieldSubmitResponse:
-    """
+    """Submit a value for the current template field."""
     service = TemplateService(current_context.session)
     result = await service.submit_field_value(
         user_id=current_context.user.id,
@@ -1832,7 +1844,7 @@ async def pause_template_progress(
     payload: TemplatePauseRequest,
     current_context: CurrentUserContext = Depends(get_current_user)
 ) -> TemplatePauseResponse:
-    """
+    """Pause template progress."""
     service = TemplateService(current_context.session)
     result = await service.pause_template_filling(
         user_id=current_context.user.id,
@@ -1856,7 +1868,7 @@ async def get_current_template_progress(
     question_id: int,
     current_context: CurrentUserContext = Depends(get_current_user)
 ) -> TemplateProgressResponse:
-    """
+    """Get current template progress for a question."""
     service = TemplateService(current_context.session)
     result = await service.get_template_progress(
         user_id=current_context.user.id,
@@ -2085,6 +2097,7 @@ async def create_gratitude(
         user_id=current_context.user.id,
         text=payload.text
     )
+    await current_context.session.commit()
 
     return GratitudeItem(
         id=gratitude.id,
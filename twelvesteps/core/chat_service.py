@@ -59,6 +59,7 @@ async def handle_chat(telegram_id: int | str, message: str, debug: bool) -> str:
         user = await user_repo.find_or_create_user_by_telegram_id(telegram_id=telegram_id_value)
         if not user:
             raise RuntimeError(f"Unable to locate or create user with telegram_id={telegram_id}")
+        await session.commit()
 
         user_id = user.id
         personalized_prompt = await user_repo.get_personalized_prompt(user_id) or ""
@@ -110,6 +111,7 @@ async def handle_chat(telegram_id: int | str, message: str, debug: bool) -> str:
         vector_store = VectorStoreService()
         openai_client = AsyncOpenAI()
 
+        new_frames = []
         if parts and getattr(parts, "parts", None):
             for part in parts.parts:
                 block_titles = getattr(part, "blocks", []) or []
@@ -129,14 +131,21 @@ async def handle_chat(telegram_id: int | str, message: str, debug: bool) -> str:
                     action=getattr(part, "action", None),
                     strategy_hint=getattr(part, "strategy_hint", None),
                 )
+                new_frames.append((frame, part, block_titles))
 
-                try:
-                    embedding_response = await openai_client.embeddings.create(
-                        model="text-embedding-3-small",
-                        input=part.part
-                    )
-                    embedding = embedding_response.data[0].embedding
+        # One embeddings request for every new frame plus the message itself
+        # (last input), instead of one round-trip per text.
+        query_embedding = None
+        try:
+            embedding_response = await openai_client.embeddings.create(
+                model="text-embedding-3-small",
+                input=[part.part for _, part, _ in new_frames] + [message]
+            )
+            embeddings = [d.embedding for d in sorted(embedding_response.data, key=lambda d: d.index)]
+            query_embedding = embeddings.pop()
 
+            for (frame, part, block_titles), embedding in zip(new_frames, embeddings):
+                try:
                     vector_store.add_frame_embedding(
                         frame_id=frame.id,
                         content=part.part,
@@ -151,7 +160,10 @@ async def handle_chat(telegram_id: int | str, message: str, debug: bool) -> str:
                     )
                 except Exception as e:
                     if debug:
-                        print(f"[handle_chat] Error creating embedding for frame {frame.id}: {e}")
+                        print(f"[handle_chat] Error storing embedding for frame {frame.id}: {e}")
+        except Exception as e:
+            if debug:
+                print(f"[handle_chat] Error creating embeddings: {e}")
 
         block_based_frames = await frame_repo.get_relevant_frames(
             user_id=user_id,
@@ -161,38 +173,33 @@ async def handle_chat(telegram_id: int | str, message: str, debug: bool) -> str:
 
         semantic_frames = []
         core_context = ""
-        try:
-            embedding_response = await openai_client.embeddings.create(
-                model="text-embedding-3-small",
-                input=message
-            )
-            query_embedding = embedding_response.data[0].embedding
-
-            semantic_results = vector_store.search_frames(
-                query_embedding=query_embedding,
-                user_id=user_id,
-                limit=5
-            )
-
-            if semantic_results.get("ids") and len(semantic_results["ids"][0]) > 0:
-                semantic_frame_ids = [int(frame_id) for frame_id in semantic_results["ids"][0]]
-                semantic_frames = await frame_repo.get_frames_by_ids(semantic_frame_ids)
-
-            if vector_store.get_core_count() > 0:
-                core_results = vector_store.search_core(
+        if query_embedding is not None:
+            try:
+                semantic_results = vector_store.search_frames(
                     query_embedding=query_embedding,
-                    limit=3
+                    user_id=user_id,
+                    limit=5
                 )
 
-                if core_results.get("documents") and len(core_results["documents"][0]) > 0:
-                    core_chunks = core_results["documents"][0]
-                    core_context = "\n\n[Контекст из ядра GPT-SELF]:\n" + "\n---\n".join(core_chunks)
-                    if debug:
-                        print(f"[handle_chat] Found {len(core_chunks)} relevant core chunks")
+                if semantic_results.get("ids") and len(semantic_results["ids"][0]) > 0:
+                    semantic_frame_ids = [int(frame_id) for frame_id in semantic_results["ids"][0]]
+                    semantic_frames = await frame_repo.get_frames_by_ids(semantic_frame_ids)
 
-        except Exception as e:
-            if debug:
-                print(f"[handle_chat] Error in semantic search: {e}")
+                if vector_store.get_core_count() > 0:
+                    core_results = vector_store.search_core(
+                        query_embedding=query_embedding,
+                        limit=3
+                    )
+
+                    if core_results.get("documents") and len(core_results["documents"][0]) > 0:
+                        core_chunks = core_results["documents"][0]
+                        core_context = "\n\n[Контекст из ядра GPT-SELF]:\n" + "\n---\n".join(core_chunks)
+                        if debug:
+                            print(f"[handle_chat] Found {len(core_chunks)} relevant core chunks")
+
+            except Exception as e:
+                if debug:
+                    print(f"[handle_chat] Error in semantic search: {e}")
 
         all_frame_ids = set()
         relevant_frames = []
@@ -253,9 +260,8 @@ async def handle_chat(telegram_id: int | str, message: str, debug: bool) -> str:
             if debug:
                 print(f"[Profile Updated] ID: {user_id} | New Info: {analysis_result.extracted_info}")
 
-    async with async_session_factory() as session:
-        from services.personalization_service import update_personalized_prompt_from_all_answers
-        await update_personalized_prompt_from_all_answers(session, user_id)
+    from services.personalization_service import schedule_personalization_refresh
+    schedule_personalization_refresh(user_id)
 
 
     bot = Bot(provider)
@@ -312,6 +318,7 @@ async def handle_thanks(telegram_id: int | str, debug: bool) -> str:
                     "Рад слышать о твоей благодарности. Это показывает твой рост."
                 ]
                 import random
+                await session.commit()
                 return ChatResponse(reply=random.choice(variation_prompts), log=None)
 
         await session_context_repo.create_or_update_context(
@@ -487,6 +494,7 @@ async def handle_sos(telegram_id: int | str) -> str:
 
         if not user:
             raise RuntimeError(f"User not found for telegram_id={telegram_id}")
+        await session.commit()
 
         user_id = user.id
         personalized_prompt = await user_repo.get_personalized_prompt(user_id) or "Нет персонализации."
@@ -552,7 +560,7 @@ async def process_profile_free_text(
 
         extracted_info = analysis_result.extracted_info if analysis_result.extracted_info else free_text
 
-        section_names = [f"{s.name} (id: {s.id})" for s in sections]
+        section_names = [f"{s['name']} (id: {s['id']})" for s in sections]
         sections_text = "\n".join(section_names)
 
         distribution_prompt = f"""Распредели следующую информацию по соответствующим разделам профиля:
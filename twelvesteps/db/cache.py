@@ -0,0 +1,118 @@
+"""Optional Redis cache for static / slow-changing reads.
+
+Enabled only when REDIS_URL is set and the ``redis`` package is installed;
+otherwise every helper is a no-op and callers fall through to Postgres.
+Values are stored as JSON (orjson), so only plain dicts/lists/scalars can be
+cached; datetimes come back as ISO strings.
+
+Writers never delete keys themselves: they register them with
+``invalidate_on_commit`` and the keys are dropped once the session's
+transaction has actually committed (and forgotten if it rolls back).
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Optional, Set
+
+import orjson
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 3600
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+_client = None
+
+_PENDING_INVALIDATIONS = "cache_invalidate_on_commit"
+_invalidation_tasks: Set[asyncio.Task] = set()
+
+
+def get_redis():
+    """Return a shared Redis client, or None when caching is disabled."""
+    global _client
+    if _client is None and aioredis is not None:
+        url = os.getenv("REDIS_URL")
+        if url:
+            _client = aioredis.from_url(url)
+    return _client
+
+
+async def cache_get(key: str) -> Optional[Any]:
+    """Get a cached value (None on miss or when Redis is unavailable)."""
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        raw = await client.get(key)
+    except Exception as e:
+        logger.warning(f"Redis get failed for {key}: {e}")
+        return None
+    if raw is None:
+        return None
+    try:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError as e:
+        logger.warning(f"Discarding undecodable cache entry {key}: {e}")
+        return None
+
+
+async def cache_set(key: str, value: Any, ttl: int = DEFAULT_TTL) -> None:
+    """Store a value with TTL (silently skipped when Redis is unavailable)."""
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        await client.setex(key, ttl, orjson.dumps(value))
+    except Exception as e:
+        logger.warning(f"Redis set failed for {key}: {e}")
+
+
+async def cache_delete(*keys: str) -> None:
+    """Invalidate cached keys."""
+    client = get_redis()
+    if client is None or not keys:
+        return
+    try:
+        await client.delete(*keys)
+    except Exception as e:
+        logger.warning(f"Redis delete failed for {keys}: {e}")
+
+
+def invalidate_on_commit(session, *keys: str) -> None:
+    """Delete keys after session (sync or async) commits its current transaction."""
+    session.info.setdefault(_PENDING_INVALIDATIONS, set()).update(keys)
+
+
+def invalidation_pending(session, key: str) -> bool:
+    """True if session has uncommitted writes that will invalidate key.
+
+    Reads in such a session see data other sessions cannot, so they must
+    neither be served from nor stored in the cache.
+    """
+    return key in session.info.get(_PENDING_INVALIDATIONS, ())
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    keys = session.info.pop(_PENDING_INVALIDATIONS, None)
+    if not keys or get_redis() is None:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        logger.warning(f"No event loop to invalidate {keys} after commit")
+        return
+    task = loop.create_task(cache_delete(*keys))
+    _invalidation_tasks.add(task)
+    task.add_done_callback(_invalidation_tasks.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_INVALIDATIONS, None)
@@ -22,12 +22,23 @@ class Base(DeclarativeBase):
     pass
 
 
+# Each worker process holds up to DB_POOL_SIZE + DB_MAX_OVERFLOW connections,
+# so keep workers * (pool_size + max_overflow) below Postgres max_connections
+# (100 by default) minus what Alembic, psql and other clients need. The
+# defaults (5 + 10 = 15 per worker) fit four workers on a stock server.
 engine = create_async_engine(
     url = os.getenv("DATABASE_URL"),
-    echo=True
+    echo=os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes"),
+    query_cache_size=1200,
+    pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    pool_pre_ping=True,
+    pool_recycle=1800,
 )
 
 
+# One AsyncSession per request/task: sessions are not safe to share between
+# concurrently running coroutines. Repositories flush; the caller commits.
 async_session_factory = async_sessionmaker(
     engine,
     class_ = AsyncSession,
@@ -11,6 +11,7 @@ from sqlalchemy import (
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Table,
@@ -21,6 +22,7 @@ from sqlalchemy import (
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 from sqlalchemy import Enum as SQLEnum
+from sqlalchemy.dialects.postgresql import JSONB
 
 from db.database import Base
 
@@ -140,6 +142,10 @@ class Frame(Base):
 class Message(Base):
     __tablename__ = "messages"
 
+    __table_args__ = (
+        Index("ix_messages_user_id_id", "user_id", "id"),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     content: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     sender_role: Mapped[Optional[SenderRole]] = mapped_column(
@@ -240,6 +246,10 @@ class UserStep(Base):
 
 class SessionContext(Base):
     __tablename__ = "session_contexts"
+    __table_args__ = (
+        UniqueConstraint("user_id", "session_type", name="uq_session_context_user_type"),
+        Index("ix_session_context_user_updated", "user_id", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -256,7 +266,7 @@ class SessionState(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True, index=True)
     user_id: Mapped[int] = mapped_column(
-        ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+        ForeignKey("users.id", ondelete="CASCADE"), nullable=False, unique=True, index=True
     )
     recent_messages: Mapped[Optional[List[dict]]] = mapped_column(
         JSON, nullable=True
@@ -288,7 +298,7 @@ class FrameTracking(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True, index=True)
     user_id: Mapped[int] = mapped_column(
-        ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+        ForeignKey("users.id", ondelete="CASCADE"), nullable=False, unique=True, index=True
     )
     confirmed: Mapped[Optional[List[dict]]] = mapped_column(
         JSON, nullable=True
@@ -320,7 +330,7 @@ class QAStatus(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True, index=True)
     user_id: Mapped[int] = mapped_column(
-        ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+        ForeignKey("users.id", ondelete="CASCADE"), nullable=False, unique=True, index=True
     )
     last_prompt_included: Mapped[Optional[bool]] = mapped_column(
         Boolean, nullable=True, default=False
@@ -379,7 +389,7 @@ class UserMeta(Base):
 class TrackerSummary(Base):
     __tablename__ = "tracker_summaries"
 
-    table_args = (
+    __table_args__ = (
         UniqueConstraint("user_id", "date", name="uq_tracker_summary_user_date"),
     )
 
@@ -493,6 +503,10 @@ class ProfileSection(Base):
 class ProfileSectionData(Base):
     __tablename__ = "profile_section_data"
 
+    __table_args__ = (
+        Index("ix_profile_section_data_user_section_created", "user_id", "section_id", "created_at"),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
     section_id: Mapped[int] = mapped_column(ForeignKey("profile_sections.id", ondelete="CASCADE"), index=True)
@@ -567,6 +581,7 @@ class TemplateProgress(Base):
 
     __table_args__ = (
         UniqueConstraint("user_id", "step_id", "question_id", name="uq_template_progress_user_step_question"),
+        Index("ix_template_progress_user_step_q_status", "user_id", "step_id", "question_id", "status"),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
@@ -583,7 +598,7 @@ class TemplateProgress(Base):
     current_situation: Mapped[int] = mapped_column(Integer, default=1)
     current_field: Mapped[str] = mapped_column(String(50), default="where")
 
-    situations: Mapped[Optional[List[dict]]] = mapped_column(JSON, nullable=True)
+    situations: Mapped[Optional[List[dict]]] = mapped_column(JSONB, nullable=True)
 
     conclusion: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
 
@@ -627,7 +642,8 @@ class Step10DailyAnalysis(Base):
 
     current_question: Mapped[int] = mapped_column(Integer, default=1)
 
-    answers: Mapped[Optional[List[dict]]] = mapped_column(JSON, nullable=True, default=list)
+    # {"<question_number>": {"question_number", "answer", "answered_at"}}
+    answers: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True, default=dict)
 
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
@@ -1,5 +1,4 @@
-import json
-import aiofiles
+import orjson
 from typing import List, Optional
 from pydantic import BaseModel, Field
 
@@ -36,11 +35,18 @@ class ClassificationResult(BaseModel):
     parts: List[Part]
     metadata: Optional[ClassificationMetadata] = None
 
+# Model configs are static files; read each one once per process.
+_CONFIG_CACHE: dict = {}
+
+
 class OpenAI(Provider):
     async def load_config(self, path: str):
-        async with aiofiles.open(path, "r") as f:
-            content = await f.read()
-            return json.loads(content)
+        config = _CONFIG_CACHE.get(path)
+        if config is None:
+            with open(path, "rb") as f:
+                config = orjson.loads(f.read())
+            _CONFIG_CACHE[path] = config
+        return config
 
     def _format_message(self, role: str, content: str) -> dict:
         if not content:
@@ -103,7 +109,7 @@ class OpenAI(Provider):
         """Analyze user message to extract profile information."""
         config = await self.load_config("./llm/configs/openai_dynamic.json")
         prompt_json = await PromptRepository.load_include_prompt()
-        prompt_data = json.loads(prompt_json)
+        prompt_data = orjson.loads(prompt_json)
         system_prompt = prompt_data.get("prompt", "")
         
         user_input_block = f"User message: {context.message}\n\nCurrent profile: {context.assistant.personalized_prompt[:500] if context.assistant.personalized_prompt else 'Empty'}"
@@ -124,7 +130,7 @@ class OpenAI(Provider):
 
         try:
             raw = response.choices[0].message.content
-            data = json.loads(raw)
+            data = orjson.loads(raw)
             return ProfileAnalysis(**data)
         except Exception as e:
             print(f"[OpenAI.analyze_profile] Error parsing analysis: {e} | Raw: {raw}")
@@ -134,7 +140,7 @@ class OpenAI(Provider):
         """Update personalized prompt with new information."""
         config = await self.load_config("./llm/configs/openai_dynamic.json")
         prompt_json = await PromptRepository.load_update_prompt()
-        prompt_data = json.loads(prompt_json)
+        prompt_data = orjson.loads(prompt_json)
         system_prompt = prompt_data.get("prompt", "")
 
         messages = self._format_profile_task(system_prompt, new_info)
@@ -193,7 +199,7 @@ class OpenAI(Provider):
 
             raw = response.choices[0].message.content
             try:
-                data = json.loads(raw)
+                data = orjson.loads(raw)
                 result = ClassificationResult(**data)
             except Exception as e:
                 result = ClassificationResult(parts=[
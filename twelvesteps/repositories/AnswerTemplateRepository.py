@@ -63,7 +63,6 @@ class AnswerTemplateRepository:
         if structure is not None:
             template.structure = structure
 
-        self.db.add(template)
         await self.db.flush()
         return template
 
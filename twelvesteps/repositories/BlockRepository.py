@@ -1,5 +1,5 @@
 from sqlalchemy import select
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from db.models import Block as BlockModel
 
@@ -31,12 +31,15 @@ class BlockRepository:
         if block is not None:
             return block
 
-        try:
-            async with self.db.begin_nested():
-                return await self.add_block(clean_title)
-        except IntegrityError:
-            block = await self.get_block_by_title(clean_title)
-            if block:
-                return block
+        stmt = pg_insert(BlockModel).values(
+            {BlockModel.title: clean_title}
+        ).on_conflict_do_nothing(
+            index_elements=[BlockModel.title]
+        ).returning(BlockModel)
+        result = await self.db.execute(stmt)
+        block = result.scalar_one_or_none()
+        if block is not None:
+            return block
 
-            raise
\ No newline at end of file
+        # Lost the race to a concurrent insert: the row exists now.
+        return await self.get_block_by_title(clean_title)
\ No newline at end of file
@@ -1,7 +1,7 @@
 from typing import List, Optional
-from sqlalchemy import select
+from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from db.models import Frame as FrameModel, Block as BlockModel
+from db.models import Frame as FrameModel, Block as BlockModel, blocks_frames
 from repositories.BlockRepository import BlockRepository
 
 
@@ -44,11 +44,16 @@ class FrameRepository:
             block = await block_repo.get_or_create_block(title)
             blocks.append(block)
 
-        for block in blocks:
-            frame.blocks.append(block)
-
         self.db.add(frame)
         await self.db.flush()
+
+        block_ids = list(dict.fromkeys(block.id for block in blocks))
+        if block_ids:
+            await self.db.execute(
+                insert(blocks_frames).values(
+                    [{"frame_id": frame.id, "block_id": block_id} for block_id in block_ids]
+                )
+            )
         return frame
 
     async def get_relevant_frames(
@@ -1,19 +1,44 @@
 """Repository for FrameTracking operations"""
-from typing import Optional
+from typing import Any, Dict, List, Optional, TypedDict
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm.attributes import set_committed_value
 from db.models import FrameTracking
 
 
+_Q_BY_USER_ID = select(FrameTracking).where(FrameTracking.user_id == bindparam("uid"))
+
+
+class FrameEntry(TypedDict, total=False):
+    """Shape of one element of FrameTracking.confirmed / .candidates."""
+    content: str
+    data: Dict[str, Any]
+    first_seen: Optional[str]
+    confirmed_at: Optional[str]
+
+
+def normalize_frames(frames: Optional[list]) -> Optional[List[FrameEntry]]:
+    """Coerce frame entries to FrameEntry dicts so readers can rely on frame["content"]."""
+    if frames is None:
+        return None
+    normalized = []
+    for frame in frames:
+        if not isinstance(frame, dict):
+            frame = {"content": str(frame)}
+        elif "content" not in frame:
+            frame = {**frame, "content": ""}
+        normalized.append(frame)
+    return normalized
+
+
 class FrameTrackingRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
     async def get_by_user_id(self, user_id: int) -> Optional[FrameTracking]:
         """Get FrameTracking for a user"""
-        stmt = select(FrameTracking).where(FrameTracking.user_id == user_id)
-        result = await self.session.execute(stmt)
-        return result.scalars().first()
+        return await self.session.scalar(_Q_BY_USER_ID, {"uid": user_id})
 
     async def create_or_update(
         self,
@@ -24,30 +49,39 @@ class FrameTrackingRepository:
         archetypes: Optional[list] = None,
         meta_flags: Optional[list] = None,
     ) -> FrameTracking:
-        """Create or update FrameTracking for a user"""
-        existing = await self.get_by_user_id(user_id)
-
-        if existing:
-            if confirmed is not None:
-                existing.confirmed = confirmed
-            if candidates is not None:
-                existing.candidates = candidates
-            if tracking is not None:
-                existing.tracking = tracking
-            if archetypes is not None:
-                existing.archetypes = archetypes
-            if meta_flags is not None:
-                existing.meta_flags = meta_flags
-            return existing
-        else:
-            new_tracking = FrameTracking(
-                user_id=user_id,
-                confirmed=confirmed,
-                candidates=candidates,
-                tracking=tracking,
-                archetypes=archetypes,
-                meta_flags=meta_flags,
-            )
-            self.session.add(new_tracking)
-            return new_tracking
+        """Create or update FrameTracking for a user (single INSERT ... ON CONFLICT)"""
+        values = {
+            "confirmed": normalize_frames(confirmed),
+            "candidates": normalize_frames(candidates),
+            "tracking": tracking,
+            "archetypes": archetypes,
+            "meta_flags": meta_flags,
+        }
+        provided = {k: v for k, v in values.items() if v is not None}
+
+        stmt = pg_insert(FrameTracking).values(user_id=user_id, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FrameTracking.user_id],
+            set_={**provided, "updated_at": func.now()},
+        ).returning(FrameTracking)
+
+        result = await self.session.execute(
+            stmt, execution_options={"populate_existing": True}
+        )
+        return result.scalar_one()
+
+    async def update_tracking_state(self, frame_tracking: FrameTracking, tracking: dict) -> FrameTracking:
+        """
+        Overwrite only the `tracking` JSON of an existing row (plain UPDATE, no RETURNING).
 
+        The loaded instance is updated as already-persisted state, so it is not
+        dirtied and nothing is re-sent or re-read at flush/commit.
+        """
+        await self.session.execute(
+            update(FrameTracking)
+            .where(FrameTracking.id == frame_tracking.id)
+            .values(tracking=tracking, updated_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        set_committed_value(frame_tracking, "tracking", tracking)
+        return frame_tracking
@@ -5,22 +5,30 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc
 from sqlalchemy.orm import selectinload
 
+from db.cache import cache_get, cache_set, invalidate_on_commit, invalidation_pending
 from db.models import Gratitude
 
 
+COUNT_CACHE_TTL = 300
+
+
+def _count_cache_key(user_id: int) -> str:
+    return f"gratitude:count:{user_id}"
+
+
 class GratitudeRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
     async def create(self, user_id: int, text: str) -> Gratitude:
-        """Создать новую благодарность"""
+        """Создать новую благодарность (коммит выполняет вызывающий код)"""
         gratitude = Gratitude(
             user_id=user_id,
             text=text
         )
         self.session.add(gratitude)
-        await self.session.commit()
-        await self.session.refresh(gratitude)
+        await self.session.flush()
+        invalidate_on_commit(self.session, _count_cache_key(user_id))
         return gratitude
 
     async def get_user_gratitudes(
@@ -41,11 +49,21 @@ class GratitudeRepository:
         return list(result.scalars().all())
 
     async def get_count(self, user_id: int) -> int:
-        """Получить количество благодарностей пользователя"""
+        """Получить количество благодарностей пользователя (кэшируется в Redis)"""
+        cache_key = _count_cache_key(user_id)
+        use_cache = not invalidation_pending(self.session, cache_key)
+        if use_cache:
+            cached = await cache_get(cache_key)
+            if cached is not None:
+                return cached
+
         from sqlalchemy import func
         stmt = select(func.count(Gratitude.id)).where(
             Gratitude.user_id == user_id
         )
         result = await self.session.execute(stmt)
-        return result.scalar() or 0
+        count = result.scalar() or 0
+        if use_cache:
+            await cache_set(cache_key, count, ttl=COUNT_CACHE_TTL)
+        return count
 
@@ -1,7 +1,26 @@
-from typing import List
+from typing import AsyncIterator, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from db.models import Message as MessageModel, SenderRole
-from sqlalchemy import select
+from sqlalchemy import bindparam, select
+
+
+# Message ids are serial, so ordering by id matches insertion order and is
+# served by a backward scan of the (user_id, id) index.
+_Q_LAST_MESSAGES = (
+    select(MessageModel)
+    .where(MessageModel.user_id == bindparam("uid"))
+    .order_by(MessageModel.id.desc())
+    .limit(bindparam("lim"))
+)
+
+_Q_MESSAGES_BEFORE = (
+    select(MessageModel)
+    .where(MessageModel.user_id == bindparam("uid"), MessageModel.id < bindparam("before_id"))
+    .order_by(MessageModel.id.desc())
+    .limit(bindparam("lim"))
+)
+
+
 class MessageRepository():
     def __init__(self, db : AsyncSession):
         self.db = db
@@ -12,9 +31,22 @@ class MessageRepository():
         await self.db.flush()
         return message
 
-    async def get_last_messages(self, user_id, amount=100) -> List[MessageModel]:
-
-        query = select(MessageModel).where(MessageModel.user_id == user_id).order_by(MessageModel.created_at.desc()).limit(amount)
-        result = await self.db.execute(query)
+    async def get_last_messages(self, user_id, amount=100, before_id: Optional[int] = None) -> List[MessageModel]:
+        """Newest messages first; pass before_id (last seen id) to page further back."""
+        if before_id is None:
+            result = await self.db.execute(_Q_LAST_MESSAGES, {"uid": user_id, "lim": amount})
+        else:
+            result = await self.db.execute(
+                _Q_MESSAGES_BEFORE, {"uid": user_id, "before_id": before_id, "lim": amount}
+            )
         return list(result.scalars().all())
 
+    async def iter_messages(self, user_id, amount=100) -> AsyncIterator[MessageModel]:
+        """Stream newest messages first over a server-side cursor (O(1) memory for large amounts)."""
+        result = await self.db.stream_scalars(
+            _Q_LAST_MESSAGES.execution_options(yield_per=100),
+            {"uid": user_id, "lim": amount},
+        )
+        async for message in result:
+            yield message
+
@@ -1,8 +1,9 @@
 from typing import List, Optional
-from sqlalchemy import select, func
+from sqlalchemy import bindparam, select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
+from db.cache import invalidate_on_commit
 from db.models import (
     ProfileSection,
     ProfileSectionData,
@@ -11,6 +12,16 @@ from db.models import (
 )
 
 
+_Q_SECTION_QUESTIONS = select(ProfileQuestion).where(
+    ProfileQuestion.section_id == bindparam("sid")
+).order_by(ProfileQuestion.order_index)
+
+
+def sections_cache_key(user_id: Optional[int]) -> str:
+    """Redis key of the cached section list (see ProfileService.get_all_sections)."""
+    return f"profile:sections:{user_id}"
+
+
 class ProfileRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
@@ -35,10 +46,7 @@ class ProfileRepository:
 
     async def get_section_questions(self, section_id: int) -> List[ProfileQuestion]:
         """Get all questions for a section"""
-        query = select(ProfileQuestion).where(
-            ProfileQuestion.section_id == section_id
-        ).order_by(ProfileQuestion.order_index)
-        result = await self.db.execute(query)
+        result = await self.db.execute(_Q_SECTION_QUESTIONS, {"sid": section_id})
         return list(result.scalars().all())
 
     async def create_custom_section(
@@ -60,6 +68,7 @@ class ProfileRepository:
         )
         self.db.add(section)
         await self.db.flush()
+        invalidate_on_commit(self.db, sections_cache_key(user_id))
         return section
 
     async def update_section(
@@ -78,8 +87,8 @@ class ProfileRepository:
         if order_index is not None:
             section.order_index = order_index
 
-        self.db.add(section)
         await self.db.flush()
+        invalidate_on_commit(self.db, sections_cache_key(section.user_id))
         return section
 
     async def delete_section(self, section_id: int, user_id: int) -> bool:
@@ -93,6 +102,7 @@ class ProfileRepository:
 
         await self.db.delete(section)
         await self.db.flush()
+        invalidate_on_commit(self.db, sections_cache_key(user_id))
         return True
 
     async def save_answer(
@@ -189,10 +199,12 @@ class ProfileRepository:
     async def get_user_answers_for_section(
         self, user_id: int, section_id: int
     ) -> List[ProfileAnswer]:
-        """Get all user's answers for questions in a section"""
+        """Get user's latest answer (highest version) for each question in a section"""
         query = select(ProfileAnswer).join(ProfileQuestion).where(
             ProfileAnswer.user_id == user_id,
             ProfileQuestion.section_id == section_id
+        ).distinct(
+            ProfileAnswer.question_id
         ).order_by(ProfileAnswer.question_id, ProfileAnswer.version.desc())
         result = await self.db.execute(query)
         return list(result.scalars().all())
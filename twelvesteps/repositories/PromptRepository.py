@@ -1,108 +1,208 @@
+import asyncio
 import json
-import aiofiles
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional
+
+import orjson
+
 from db.models import User as UserModel
 
+
+_STEP_KB: Optional[Dict[int, dict]] = None
+
+# Prompt files are immutable during a run: keep the raw prompt strings and the
+# parsed JSON documents in memory after the first read.
+_PROMPT_CACHE: Dict[str, str] = {}
+_PARSED_CACHE: Dict[str, Any] = {}
+_LOAD_LOCKS: Dict[str, asyncio.Lock] = {}
+# Paths found missing by preload_all(); loaders skip the syscall and go
+# straight to their fallback.
+_MISSING: set = set()
+
+_SOS_FALLBACK = "You are a helpful AA sponsor. Provide a brief, supportive hint."
+_THANKS_FALLBACK = json.dumps({
+    "role": "system",
+    "content": "You are a supportive AA sponsor. Express genuine support and motivation when user uses /thanks."
+})
+_DAY_FALLBACK = json.dumps({
+    "role": "system",
+    "content": "You are a supportive AA sponsor. Help user analyze their current state when they use /day."
+})
+
+_PROMPT_FILES = (
+    "system", "classify", "dynamic", "include", "update", "sos", "thanks", "day",
+    "knowledge_base", "sos_memory", "sos_direction", "sos_question",
+    "sos_support", "sos_examples", "profile_next_question",
+)
+
+
+async def _read_bytes(path: str) -> bytes:
+    """Read a small prompt file as raw bytes (for orjson) in the default thread pool."""
+    return await asyncio.to_thread(Path(path).read_bytes)
+
+
+async def _read_optional(path: str) -> Optional[bytes]:
+    try:
+        return await _read_bytes(path)
+    except FileNotFoundError:
+        return None
+
+
+async def _load_parsed_cached(path: str) -> Any:
+    """Parse a JSON file once; concurrent cold callers share a single read."""
+    if path in _PARSED_CACHE:
+        return _PARSED_CACHE[path]
+    if path in _MISSING:
+        raise FileNotFoundError(path)
+    async with _LOAD_LOCKS.setdefault(path, asyncio.Lock()):
+        if path not in _PARSED_CACHE:
+            _PARSED_CACHE[path] = orjson.loads(await _read_bytes(path))
+        return _PARSED_CACHE[path]
+
+
+async def _load_json_cached(path: str) -> str:
+    """Return the JSON prompt text for path as-is, reading it only once.
+
+    The content is not round-tripped through a parser here; preload_all()
+    validates every prompt file once at startup.
+    """
+    if path in _PROMPT_CACHE:
+        return _PROMPT_CACHE[path]
+    if path in _MISSING:
+        raise FileNotFoundError(path)
+    async with _LOAD_LOCKS.setdefault(path, asyncio.Lock()):
+        if path not in _PROMPT_CACHE:
+            _PROMPT_CACHE[path] = (await _read_bytes(path)).decode("utf-8")
+        return _PROMPT_CACHE[path]
+
+
+def _freeze(value: Any) -> Any:
+    """Read-only deep copy: dicts become mapping proxies, lists become tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+@lru_cache(maxsize=16)
+def _step_knowledge(step_number: int) -> Mapping[str, Any]:
+    """Resolve step knowledge from the built index, defaulting for unknown steps.
+
+    The result is shared by every caller through the cache, so it is frozen.
+    Must only be called after PromptRepository._get_step_index() has run.
+    """
+    step = _STEP_KB.get(step_number)
+    if step is None:
+        step = {
+            "name": f"Шаг {step_number}",
+            "essence": "",
+            "keywords": [],
+            "typical_situations": [],
+            "guiding_areas": []
+        }
+    return _freeze(step)
+
+
 class PromptRepository:
 
+    @staticmethod
+    async def preload_all():
+        """Read and validate every prompt file once, concurrently.
+
+        Meant to be called from application startup so that request handlers
+        only ever hit the in-memory cache. Invalid JSON raises here instead of
+        on the request path.
+        """
+        paths = [f"./llm/prompts/{name}.json" for name in _PROMPT_FILES]
+        contents = await asyncio.gather(*(_read_optional(p) for p in paths))
+        for path, raw in zip(paths, contents):
+            if raw is None:
+                print(f"⚠️ Prompt file not found, loader will use its fallback: {path}")
+                _MISSING.add(path)
+                continue
+            _PARSED_CACHE[path] = orjson.loads(raw)
+            _PROMPT_CACHE[path] = raw.decode("utf-8")
+        await PromptRepository._get_step_index()
+
     @staticmethod
     async def load_system_prompt():
-        async with aiofiles.open("./llm/prompts/system.json", "r", encoding="utf-8") as f:
-            content = await f.read()
-            return json.dumps(json.loads(content))
+        return await _load_json_cached("./llm/prompts/system.json")
 
     @staticmethod
     async def load_classify_prompt():
-        async with aiofiles.open("./llm/prompts/classify.json", "r", encoding="utf-8") as f:
-            content = await f.read()
-            return json.dumps(json.loads(content))
+        return await _load_json_cached("./llm/prompts/classify.json")
 
     @staticmethod
     async def load_dynamic_prompt():
-        async with aiofiles.open("./llm/prompts/dynamic.json", "r", encoding="utf-8") as f:
-            content = await f.read()
-            return json.dumps(json.loads(content))
+        return await _load_json_cached("./llm/prompts/dynamic.json")
 
     @staticmethod
     async def load_include_prompt():
-        async with aiofiles.open("./llm/prompts/include.json", "r", encoding="utf-8") as f:
-            content = await f.read()
-            return json.dumps(json.loads(content))
+        return await _load_json_cached("./llm/prompts/include.json")
 
     @staticmethod
     async def load_update_prompt():
-        async with aiofiles.open("./llm/prompts/include.json", "r", encoding="utf-8") as f:
-            content = await f.read()
-            return json.dumps(json.loads(content))
+        return await _load_json_cached("./llm/prompts/update.json")
 
     @staticmethod
     async def load_sos_prompt():
         """Load SOS prompt from file."""
         try:
-            async with aiofiles.open("./llm/prompts/sos.json", "r", encoding="utf-8") as f:
-                content = await f.read()
-                return json.dumps(json.loads(content))
+            return await _load_json_cached("./llm/prompts/sos.json")
         except FileNotFoundError:
-            return "You are a helpful AA sponsor. Provide a brief, supportive hint."
+            return _SOS_FALLBACK
 
     @staticmethod
     async def load_thanks_prompt():
         """Load thanks prompt from file."""
         try:
-            async with aiofiles.open("./llm/prompts/thanks.json", "r", encoding="utf-8") as f:
-                content = await f.read()
-                return json.dumps(json.loads(content))
+            return await _load_json_cached("./llm/prompts/thanks.json")
         except FileNotFoundError:
-            return json.dumps({
-                "role": "system",
-                "content": "You are a supportive AA sponsor. Express genuine support and motivation when user uses /thanks."
-            })
+            return _THANKS_FALLBACK
 
     @staticmethod
     async def load_day_prompt():
         """Load day prompt from file."""
         try:
-            async with aiofiles.open("./llm/prompts/day.json", "r", encoding="utf-8") as f:
-                content = await f.read()
-                return json.dumps(json.loads(content))
+            return await _load_json_cached("./llm/prompts/day.json")
         except FileNotFoundError:
-            return json.dumps({
-                "role": "system",
-                "content": "You are a supportive AA sponsor. Help user analyze their current state when they use /day."
-            })
+            return _DAY_FALLBACK
 
     @staticmethod
     async def load_knowledge_base():
         """Load knowledge base from file."""
         try:
-            async with aiofiles.open("./llm/prompts/knowledge_base.json", "r", encoding="utf-8") as f:
-                content = await f.read()
-                return json.loads(content)
+            return await _load_parsed_cached("./llm/prompts/knowledge_base.json")
         except FileNotFoundError:
             return None
 
     @staticmethod
-    async def get_step_knowledge(step_number: int) -> dict:
-        """Get knowledge for a specific step."""
-        knowledge_base = await PromptRepository.load_knowledge_base()
-        if knowledge_base and "steps" in knowledge_base:
-            step_key = str(step_number)
-            if step_key in knowledge_base["steps"]:
-                return knowledge_base["steps"][step_key]
-        return {
-            "name": f"Шаг {step_number}",
-            "essence": "",
-            "keywords": [],
-            "typical_situations": [],
-            "guiding_areas": []
-        }
+    async def _get_step_index() -> Dict[int, dict]:
+        """Build (once) the knowledge base steps indexed by int step number."""
+        global _STEP_KB
+        if _STEP_KB is not None:
+            return _STEP_KB
+        async with _LOAD_LOCKS.setdefault("step_index", asyncio.Lock()):
+            if _STEP_KB is None:
+                knowledge_base = await PromptRepository.load_knowledge_base()
+                steps = (knowledge_base or {}).get("steps", {})
+                _STEP_KB = {int(k): v for k, v in steps.items()}
+            return _STEP_KB
+
+    @staticmethod
+    async def get_step_knowledge(step_number: int) -> Mapping[str, Any]:
+        """Get knowledge for a specific step (read-only)."""
+        await PromptRepository._get_step_index()
+        return _step_knowledge(step_number)
 
     @staticmethod
     async def load_sos_memory_prompt():
         """Load SOS memory prompt from file."""
         try:
-            async with aiofiles.open("./llm/prompts/sos_memory.json", "r", encoding="utf-8") as f:
-                content = await f.read()
-                return json.loads(content).get("prompt", "")
+            return (await _load_parsed_cached("./llm/prompts/sos_memory.json")).get("prompt", "")
         except FileNotFoundError:
             return None
 
@@ -110,9 +210,7 @@ class PromptRepository:
     async def load_sos_direction_prompt():
         """Load SOS direction prompt from file."""
         try:
-            async with aiofiles.open("./llm/prompts/sos_direction.json", "r", encoding="utf-8") as f:
-                content = await f.read()
-                return json.loads(content).get("prompt", "")
+            return (await _load_parsed_cached("./llm/prompts/sos_direction.json")).get("prompt", "")
         except FileNotFoundError:
             return None
 
@@ -120,9 +218,7 @@ class PromptRepository:
     async def load_sos_question_prompt():
         """Load SOS question prompt from file."""
         try:
-            async with aiofiles.open("./llm/prompts/sos_question.json", "r", encoding="utf-8") as f:
-                content = await f.read()
-                return json.loads(content).get("prompt", "")
+            return (await _load_parsed_cached("./llm/prompts/sos_question.json")).get("prompt", "")
         except FileNotFoundError:
             return None
 
@@ -130,9 +226,7 @@ class PromptRepository:
     async def load_sos_support_prompt():
         """Load SOS support prompt from file."""
         try:
-            async with aiofiles.open("./llm/prompts/sos_support.json", "r", encoding="utf-8") as f:
-                content = await f.read()
-                return json.loads(content).get("prompt", "")
+            return (await _load_parsed_cached("./llm/prompts/sos_support.json")).get("prompt", "")
         except FileNotFoundError:
             return None
 
@@ -140,17 +234,13 @@ class PromptRepository:
     async def load_sos_examples_prompt():
         """Load SOS examples prompt from file."""
         try:
-            async with aiofiles.open("./llm/prompts/sos_examples.json", "r", encoding="utf-8") as f:
-                content = await f.read()
-                return json.loads(content).get("prompt", "")
+            return (await _load_parsed_cached("./llm/prompts/sos_examples.json")).get("prompt", "")
         except FileNotFoundError:
             return None
 
     @staticmethod
     async def load_profile_next_question_prompt():
         try:
-            async with aiofiles.open("./llm/prompts/profile_next_question.json", "r", encoding="utf-8") as f:
-                content = await f.read()
-                return json.loads(content).get("prompt", "")
+            return (await _load_parsed_cached("./llm/prompts/profile_next_question.json")).get("prompt", "")
         except FileNotFoundError:
             return None
\ No newline at end of file
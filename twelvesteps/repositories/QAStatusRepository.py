@@ -1,19 +1,21 @@
 """Repository for QAStatus operations"""
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from db.models import QAStatus
 
 
+_Q_BY_USER_ID = select(QAStatus).where(QAStatus.user_id == bindparam("uid"))
+
+
 class QAStatusRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
     async def get_by_user_id(self, user_id: int) -> Optional[QAStatus]:
         """Get QAStatus for a user"""
-        stmt = select(QAStatus).where(QAStatus.user_id == user_id)
-        result = await self.session.execute(stmt)
-        return result.scalars().first()
+        return await self.session.scalar(_Q_BY_USER_ID, {"uid": user_id})
 
     async def create_or_update(
         self,
@@ -23,27 +25,22 @@ class QAStatusRepository:
         open_threads: Optional[int] = None,
         rebuild_required: Optional[bool] = None,
     ) -> QAStatus:
-        """Create or update QAStatus for a user"""
-        existing = await self.get_by_user_id(user_id)
-
-        if existing:
-            if last_prompt_included is not None:
-                existing.last_prompt_included = last_prompt_included
-            if trace_ok is not None:
-                existing.trace_ok = trace_ok
-            if open_threads is not None:
-                existing.open_threads = open_threads
-            if rebuild_required is not None:
-                existing.rebuild_required = rebuild_required
-            return existing
-        else:
-            new_status = QAStatus(
-                user_id=user_id,
-                last_prompt_included=last_prompt_included,
-                trace_ok=trace_ok,
-                open_threads=open_threads,
-                rebuild_required=rebuild_required,
-            )
-            self.session.add(new_status)
-            return new_status
+        """Create or update QAStatus for a user (single INSERT ... ON CONFLICT)"""
+        values = {
+            "last_prompt_included": last_prompt_included,
+            "trace_ok": trace_ok,
+            "open_threads": open_threads,
+            "rebuild_required": rebuild_required,
+        }
+        provided = {k: v for k, v in values.items() if v is not None}
+
+        stmt = pg_insert(QAStatus).values(user_id=user_id, **provided)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[QAStatus.user_id],
+            set_={**provided, "updated_at": func.now()},
+        ).returning(QAStatus)
 
+        result = await self.session.execute(
+            stmt, execution_options={"populate_existing": True}
+        )
+        return result.scalar_one()
@@ -1,8 +1,8 @@
 """Repository for SessionContext operations"""
 from typing import Optional, Dict, Any
-from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
+from sqlalchemy import func, select, update, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import selectinload
 
 from db.models import SessionContext, SessionType, User
@@ -18,26 +18,23 @@ class SessionContextRepository:
         session_type: SessionType,
         context_data: Dict[str, Any]
     ) -> SessionContext:
-        """Create or update session context for a user"""
-        stmt = select(SessionContext).where(
-            SessionContext.user_id == user_id,
-            SessionContext.session_type == session_type
+        """Create or update session context for a user (single INSERT ... ON CONFLICT)"""
+        provided = {"context_data": context_data} if context_data is not None else {}
+
+        stmt = pg_insert(SessionContext).values(
+            user_id=user_id,
+            session_type=session_type,
+            **provided
         )
-        result = await self.session.execute(stmt)
-        existing = result.scalars().first()
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[SessionContext.user_id, SessionContext.session_type],
+            set_={**provided, "updated_at": func.now()},
+        ).returning(SessionContext)
 
-        if existing:
-            existing.context_data = context_data
-            existing.updated_at = datetime.utcnow()
-            return existing
-        else:
-            new_context = SessionContext(
-                user_id=user_id,
-                session_type=session_type,
-                context_data=context_data
-            )
-            self.session.add(new_context)
-            return new_context
+        result = await self.session.execute(
+            stmt, execution_options={"populate_existing": True}
+        )
+        return result.scalar_one()
 
     async def get_active_context(
         self,
@@ -54,8 +51,8 @@ class SessionContextRepository:
         else:
             stmt = stmt.order_by(SessionContext.updated_at.desc())
 
-        result = await self.session.execute(stmt)
-        return result.scalars().first()
+        result = await self.session.execute(stmt.limit(1))
+        return result.scalar_one_or_none()
 
     async def delete_context(
         self,
@@ -80,17 +77,16 @@ class SessionContextRepository:
         context_data: Dict[str, Any]
     ) -> Optional[SessionContext]:
         """Update context data for existing session"""
-        stmt = select(SessionContext).where(
+        stmt = update(SessionContext).where(
             SessionContext.user_id == user_id,
             SessionContext.session_type == session_type
-        )
-        result = await self.session.execute(stmt)
-        context = result.scalars().first()
-
-        if context:
-            context.context_data = context_data
-            context.updated_at = datetime.utcnow()
-            return context
+        ).values(
+            context_data=context_data,
+            updated_at=func.now()
+        ).returning(SessionContext)
 
-        return None
+        result = await self.session.execute(
+            stmt, execution_options={"populate_existing": True}
+        )
+        return result.scalar_one_or_none()
 
@@ -1,13 +1,33 @@
 """Repository for Step 10 daily analysis tracking"""
 from typing import Optional, List
-from datetime import datetime, date
+from datetime import datetime, date, timezone
+from itertools import chain
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, and_, func, literal, update
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
+from sqlalchemy.orm import load_only
 
 from db.models import Step10DailyAnalysis, Step10AnalysisStatus
 
 
+# Columns the step 10 flow actually reads; timestamps are only ever written.
+_ANALYSIS_COLUMNS = load_only(
+    Step10DailyAnalysis.status,
+    Step10DailyAnalysis.current_question,
+    Step10DailyAnalysis.answers,
+    Step10DailyAnalysis.analysis_date,
+)
+
+
+def _answers_by_question(answers) -> dict:
+    """Return a fresh {"<question_number>": answer} dict (tolerates the legacy list shape)."""
+    if not answers:
+        return {}
+    if isinstance(answers, list):
+        return {str(ans.get("question_number", 0)): ans for ans in answers}
+    return dict(answers)
+
+
 class Step10DailyAnalysisRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
@@ -19,7 +39,9 @@ class Step10DailyAnalysisRepository:
         if analysis_date is None:
             analysis_date = date.today()
 
-        stmt = select(Step10DailyAnalysis).where(
+        # user_id/analysis_date hit the leading keys of the
+        # (user_id, analysis_date) unique index; status filters the single row.
+        stmt = select(Step10DailyAnalysis).options(_ANALYSIS_COLUMNS).where(
             and_(
                 Step10DailyAnalysis.user_id == user_id,
                 Step10DailyAnalysis.analysis_date == analysis_date,
@@ -30,7 +52,7 @@ class Step10DailyAnalysisRepository:
             )
         )
         result = await self.session.execute(stmt)
-        return result.scalars().first()
+        return result.scalar_one_or_none()
 
     async def get_any_analysis(
         self, user_id: int, analysis_date: Optional[date] = None
@@ -39,14 +61,14 @@ class Step10DailyAnalysisRepository:
         if analysis_date is None:
             analysis_date = date.today()
 
-        stmt = select(Step10DailyAnalysis).where(
+        stmt = select(Step10DailyAnalysis).options(_ANALYSIS_COLUMNS).where(
             and_(
                 Step10DailyAnalysis.user_id == user_id,
                 Step10DailyAnalysis.analysis_date == analysis_date
             )
         )
         result = await self.session.execute(stmt)
-        return result.scalars().first()
+        return result.scalar_one_or_none()
 
     async def get_or_create_analysis(
         self, user_id: int, analysis_date: Optional[date] = None
@@ -61,69 +83,75 @@ class Step10DailyAnalysisRepository:
             if analysis.status == Step10AnalysisStatus.COMPLETED:
                 analysis.status = Step10AnalysisStatus.IN_PROGRESS
                 analysis.current_question = 1
-                analysis.answers = []
+                analysis.answers = {}
                 analysis.completed_at = None
-                analysis.updated_at = datetime.utcnow()
-                self.session.add(analysis)
-                await self.session.flush()
+                analysis.updated_at = datetime.now(timezone.utc)
             elif analysis.status == Step10AnalysisStatus.PAUSED:
                 analysis.status = Step10AnalysisStatus.IN_PROGRESS
                 analysis.paused_at = None
-                analysis.updated_at = datetime.utcnow()
-                self.session.add(analysis)
-                await self.session.flush()
+                analysis.updated_at = datetime.now(timezone.utc)
             return analysis
 
-        analysis = Step10DailyAnalysis(
+        stmt = pg_insert(Step10DailyAnalysis).values(
             user_id=user_id,
             analysis_date=analysis_date,
             status=Step10AnalysisStatus.IN_PROGRESS,
             current_question=1,
-            answers=[]
-        )
-        self.session.add(analysis)
-        await self.session.flush()
+            answers={}
+        ).on_conflict_do_nothing(
+            index_elements=[Step10DailyAnalysis.user_id, Step10DailyAnalysis.analysis_date]
+        ).returning(Step10DailyAnalysis)
+        result = await self.session.execute(stmt)
+        analysis = result.scalar_one_or_none()
+        if analysis is not None:
+            return analysis
 
-        return analysis
+        # Lost a race with a concurrent request for the same day.
+        return await self.get_any_analysis(user_id, analysis_date)
 
     async def save_answer(
         self, analysis: Step10DailyAnalysis, question_number: int, answer: str
     ) -> dict:
-        """Save an answer and move to the next question."""
-        answers = analysis.answers or []
-
-        answer_found = False
-        for i, ans in enumerate(answers):
-            if ans.get("question_number") == question_number:
-                answers[i]["answer"] = answer
-                answers[i]["answered_at"] = datetime.utcnow().isoformat()
-                answer_found = True
-                break
-
-        if not answer_found:
-            answers.append({
+        """Save an answer and move to the next question.
+
+        The answer is merged into the JSONB column server-side, so only the
+        new entry is sent regardless of how many answers are stored.
+        """
+        now = datetime.now(timezone.utc)
+        entry = {
+            str(question_number): {
                 "question_number": question_number,
                 "answer": answer,
-                "answered_at": datetime.utcnow().isoformat()
-            })
-
-        analysis.answers = answers
+                "answered_at": now.isoformat()
+            }
+        }
+        values = {
+            "answers": func.coalesce(
+                Step10DailyAnalysis.answers, literal({}, JSONB)
+            ).op("||")(literal(entry, JSONB)),
+            "updated_at": now,
+        }
 
         next_question = None
         is_complete = False
 
         if question_number < 10:
             next_question = question_number + 1
-            analysis.current_question = next_question
+            values["current_question"] = next_question
         else:
             is_complete = True
-            analysis.status = Step10AnalysisStatus.COMPLETED
-            analysis.completed_at = datetime.utcnow()
-            analysis.current_question = 10
-
-        analysis.updated_at = datetime.utcnow()
-        self.session.add(analysis)
-        await self.session.flush()
+            values["status"] = Step10AnalysisStatus.COMPLETED
+            values["completed_at"] = now
+            values["current_question"] = 10
+
+        stmt = update(Step10DailyAnalysis).where(
+            Step10DailyAnalysis.id == analysis.id
+        ).values(values).returning(Step10DailyAnalysis)
+        # The row has to be fetched from RETURNING for populate_existing to
+        # refresh `analysis` with the merged answers and new status.
+        analysis = (await self.session.execute(
+            stmt, execution_options={"populate_existing": True}
+        )).scalar_one()
 
         progress_summary = self.get_progress_summary(analysis)
 
@@ -135,12 +163,10 @@ class Step10DailyAnalysisRepository:
 
     async def pause_analysis(self, analysis: Step10DailyAnalysis) -> Step10DailyAnalysis:
         """Поставить самоанализ на паузу"""
+        now = datetime.now(timezone.utc)
         analysis.status = Step10AnalysisStatus.PAUSED
-        analysis.paused_at = datetime.utcnow()
-        analysis.updated_at = datetime.utcnow()
-
-        self.session.add(analysis)
-        await self.session.flush()
+        analysis.paused_at = now
+        analysis.updated_at = now
 
         return analysis
 
@@ -148,13 +174,15 @@ class Step10DailyAnalysisRepository:
         """Возобновить самоанализ с паузы"""
         analysis.status = Step10AnalysisStatus.IN_PROGRESS
         analysis.paused_at = None
-        analysis.updated_at = datetime.utcnow()
-
-        self.session.add(analysis)
-        await self.session.flush()
+        analysis.updated_at = datetime.now(timezone.utc)
 
         return analysis
 
+    def get_answers_list(self, analysis: Step10DailyAnalysis) -> List[dict]:
+        """Ответы в порядке номеров вопросов (формат API)"""
+        answers = _answers_by_question(analysis.answers)
+        return [answers[key] for key in sorted(answers, key=int)]
+
     def get_progress_summary(self, analysis: Step10DailyAnalysis) -> str:
         """Получить текстовое описание прогресса"""
         answers = analysis.answers or []
@@ -170,17 +198,13 @@ class Step10DailyAnalysisRepository:
 
     def format_analysis_for_saving(self, analysis: Step10DailyAnalysis) -> str:
         """Форматировать заполненный самоанализ для сохранения"""
-        answers = analysis.answers or []
-        result_parts = []
-
-        result_parts.append(f"📘 Ежедневный самоанализ (10 шаг) — {analysis.analysis_date.strftime('%d.%m.%Y')}\n")
-
-        sorted_answers = sorted(answers, key=lambda x: x.get("question_number", 0))
-
-        for ans in sorted_answers:
-            q_num = ans.get("question_number", 0)
-            answer_text = ans.get("answer", "")
-            result_parts.append(f"{q_num}. {answer_text}\n")
-
-        return "\n".join(result_parts)
+        answers = _answers_by_question(analysis.answers).values()
+        # Every part ends with "\n" and is joined with "\n", so entries are
+        # separated by a blank line (the saved format clients expect).
+        header = f"📘 Ежедневный самоанализ (10 шаг) — {analysis.analysis_date:%d.%m.%Y}\n"
+        lines = (
+            f"{ans.get('question_number', 0)}. {ans.get('answer', '')}\n"
+            for ans in sorted(answers, key=lambda x: x.get("question_number", 0))
+        )
+        return "\n".join(chain((header,), lines))
 
@@ -1,9 +1,9 @@
 """Repository for template progress tracking"""
 from typing import Optional, List
-from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, and_, func, literal, update, Text
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.orm import load_only
 
 from db.models import TemplateProgress, TemplateProgressStatus
 
@@ -18,8 +18,25 @@ TEMPLATE_FIELDS = [
 ]
 
 FIELD_ORDER = [f["key"] for f in TEMPLATE_FIELDS]
+NEXT_FIELD = {
+    key: FIELD_ORDER[i + 1] if i + 1 < len(FIELD_ORDER) else None
+    for i, key in enumerate(FIELD_ORDER)
+}
+_FIELD_BY_KEY = {f["key"]: f for f in TEMPLATE_FIELDS}
 MIN_SITUATIONS = 3
 
+# Columns the template flow reads; timestamps are only ever written.
+_PROGRESS_COLUMNS = load_only(
+    TemplateProgress.user_id,
+    TemplateProgress.step_id,
+    TemplateProgress.question_id,
+    TemplateProgress.status,
+    TemplateProgress.current_situation,
+    TemplateProgress.current_field,
+    TemplateProgress.situations,
+    TemplateProgress.conclusion,
+)
+
 
 class TemplateProgressRepository:
     def __init__(self, session: AsyncSession):
@@ -29,7 +46,7 @@ class TemplateProgressRepository:
         self, user_id: int, step_id: int, question_id: int
     ) -> Optional[TemplateProgress]:
         """Получить активный прогресс по шаблону для вопроса"""
-        stmt = select(TemplateProgress).where(
+        stmt = select(TemplateProgress).options(_PROGRESS_COLUMNS).where(
             and_(
                 TemplateProgress.user_id == user_id,
                 TemplateProgress.step_id == step_id,
@@ -47,7 +64,7 @@ class TemplateProgressRepository:
         self, user_id: int, step_id: int, question_id: int
     ) -> Optional[TemplateProgress]:
         """Получить любой прогресс по шаблону для вопроса (включая COMPLETED и CANCELLED)"""
-        stmt = select(TemplateProgress).where(
+        stmt = select(TemplateProgress).options(_PROGRESS_COLUMNS).where(
             and_(
                 TemplateProgress.user_id == user_id,
                 TemplateProgress.step_id == step_id,
@@ -72,9 +89,6 @@ class TemplateProgressRepository:
                 progress.conclusion = None
                 progress.paused_at = None
                 progress.completed_at = None
-                progress.updated_at = datetime.utcnow()
-                self.session.add(progress)
-                await self.session.flush()
             return progress
 
         progress = TemplateProgress(
@@ -94,8 +108,13 @@ class TemplateProgressRepository:
     async def save_field_value(
         self, progress: TemplateProgress, field_key: str, value: str
     ) -> dict:
-        """Save a field value and determine the next field to fill."""
-        situations = progress.situations or []
+        """Save a field value and determine the next field to fill.
+
+        Only the edited situation is sent back: it is written into the JSONB
+        array with jsonb_set in the same UPDATE that advances the cursor.
+        """
+        situations = list(progress.situations or [])
+        stored_count = len(situations)
         current_sit_idx = progress.current_situation - 1
 
         while len(situations) <= current_sit_idx:
@@ -109,7 +128,8 @@ class TemplateProgressRepository:
                 "complete": False
             })
 
-        current_situation = situations[current_sit_idx]
+        current_situation = dict(situations[current_sit_idx])
+        situations[current_sit_idx] = current_situation
 
         if field_key == "feelings_before":
             existing_feelings = current_situation.get(field_key, [])
@@ -123,8 +143,7 @@ class TemplateProgressRepository:
         else:
             current_situation[field_key] = value
 
-        current_field_idx = FIELD_ORDER.index(field_key)
-        next_field_idx = current_field_idx + 1
+        next_field = NEXT_FIELD[field_key]
 
         result = {
             "next_field": None,
@@ -135,72 +154,92 @@ class TemplateProgressRepository:
             "is_complete": False
         }
 
-        if next_field_idx < len(FIELD_ORDER):
-            next_field = FIELD_ORDER[next_field_idx]
-            progress.current_field = next_field
+        next_situation = progress.current_situation
+
+        if next_field is not None:
             result["next_field"] = next_field
         else:
             current_situation["complete"] = True
             result["is_situation_complete"] = True
 
             if progress.current_situation < MIN_SITUATIONS:
-                progress.current_situation += 1
-                progress.current_field = "where"
-                result["current_situation"] = progress.current_situation
+                next_situation = progress.current_situation + 1
+                next_field = "where"
+                result["current_situation"] = next_situation
                 result["next_field"] = "where"
             else:
                 result["is_all_situations_complete"] = True
                 result["ready_for_conclusion"] = True
-                progress.current_field = "conclusion"
+                next_field = "conclusion"
                 result["next_field"] = "conclusion"
 
-        progress.situations = situations
-        progress.updated_at = datetime.utcnow()
-
-        self.session.add(progress)
-        await self.session.flush()
+        if current_sit_idx <= stored_count:
+            # Replaces the element in place, or appends when idx == length.
+            situations_value = func.jsonb_set(
+                func.coalesce(TemplateProgress.situations, literal([], JSONB)),
+                literal([str(current_sit_idx)], ARRAY(Text)),
+                literal(current_situation, JSONB),
+                True,
+            )
+        else:
+            situations_value = situations
+
+        stmt = update(TemplateProgress).where(
+            TemplateProgress.id == progress.id
+        ).values(
+            situations=situations_value,
+            current_situation=next_situation,
+            current_field=next_field,
+            updated_at=func.now(),
+        ).returning(TemplateProgress)
+        # Fetching the RETURNING row is what refreshes `progress` in place, so
+        # callers see the jsonb_set result and the advanced cursor.
+        (await self.session.execute(
+            stmt, execution_options={"populate_existing": True}
+        )).scalar_one()
 
         return result
 
     async def save_conclusion(self, progress: TemplateProgress, conclusion: str) -> bool:
         """Сохранить финальный вывод и завершить шаблон"""
-        progress.conclusion = conclusion
-        progress.status = TemplateProgressStatus.COMPLETED
-        progress.completed_at = datetime.utcnow()
-        progress.current_field = "done"
-
-        self.session.add(progress)
-        await self.session.flush()
+        stmt = update(TemplateProgress).where(
+            TemplateProgress.id == progress.id
+        ).values(
+            conclusion=conclusion,
+            status=TemplateProgressStatus.COMPLETED,
+            completed_at=func.now(),
+            current_field="done",
+        ).returning(TemplateProgress)
+        # Fetching the RETURNING row is what refreshes `progress` in place.
+        (await self.session.execute(
+            stmt, execution_options={"populate_existing": True}
+        )).scalar_one()
 
         return True
 
     async def pause_progress(self, progress: TemplateProgress) -> TemplateProgress:
         """Поставить прогресс на паузу"""
-        progress.status = TemplateProgressStatus.PAUSED
-        progress.paused_at = datetime.utcnow()
-
-        self.session.add(progress)
-        await self.session.flush()
-
-        return progress
+        stmt = update(TemplateProgress).where(
+            TemplateProgress.id == progress.id
+        ).values(
+            status=TemplateProgressStatus.PAUSED,
+            paused_at=func.now(),
+        ).returning(TemplateProgress)
+        return (await self.session.execute(
+            stmt, execution_options={"populate_existing": True}
+        )).scalar_one()
 
     async def resume_progress(self, progress: TemplateProgress) -> TemplateProgress:
         """Возобновить прогресс"""
         progress.status = TemplateProgressStatus.IN_PROGRESS
         progress.paused_at = None
 
-        self.session.add(progress)
-        await self.session.flush()
-
         return progress
 
     async def cancel_progress(self, progress: TemplateProgress) -> TemplateProgress:
         """Отменить прогресс"""
         progress.status = TemplateProgressStatus.CANCELLED
 
-        self.session.add(progress)
-        await self.session.flush()
-
         return progress
 
     def get_current_field_info(self, progress: TemplateProgress) -> dict:
@@ -221,14 +260,14 @@ class TemplateProgressRepository:
                 "is_complete": True
             }
 
-        for field in TEMPLATE_FIELDS:
-            if field["key"] == progress.current_field:
-                return {
-                    **field,
-                    "situation_number": progress.current_situation,
-                    "is_conclusion": False,
-                    "is_complete": False
-                }
+        field = _FIELD_BY_KEY.get(progress.current_field)
+        if field is not None:
+            return {
+                **field,
+                "situation_number": progress.current_situation,
+                "is_conclusion": False,
+                "is_complete": False
+            }
 
         return {
             "key": progress.current_field,
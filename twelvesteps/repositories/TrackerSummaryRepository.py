@@ -1,10 +1,39 @@
 """Repository for TrackerSummary operations"""
 from datetime import date
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc, and_
+from sqlalchemy import bindparam, select, desc, and_, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from db.models import TrackerSummary
 
+# Rows fetched per round-trip when streaming a period.
+STREAM_BATCH_SIZE = 256
+
+_CATEGORY_COLUMNS = ("thinking", "feeling", "behavior", "relationships", "health")
+
+
+# Built once with bind parameters so every call reuses the same statement
+# (and its compiled-SQL cache entry) instead of rebuilding the query.
+_Q_PERIOD = (
+    select(TrackerSummary)
+    .where(
+        and_(
+            TrackerSummary.user_id == bindparam("uid"),
+            TrackerSummary.date >= bindparam("start"),
+            TrackerSummary.date <= bindparam("end")
+        )
+    )
+    .order_by(TrackerSummary.date)
+)
+_Q_PERIOD_STREAM = _Q_PERIOD.execution_options(yield_per=STREAM_BATCH_SIZE)
+
+_Q_LAST_N = (
+    select(TrackerSummary)
+    .where(TrackerSummary.user_id == bindparam("uid"))
+    .order_by(desc(TrackerSummary.date))
+    .limit(bindparam("n"))
+)
+
 
 class TrackerSummaryRepository:
     def __init__(self, session: AsyncSession):
@@ -36,34 +65,32 @@ class TrackerSummaryRepository:
         start_date: date,
         end_date: date
     ) -> List[TrackerSummary]:
-        """
-        stmt = (
-            select(TrackerSummary)
-            .where(
-                and_(
-                    TrackerSummary.user_id == user_id,
-                    TrackerSummary.date >= start_date,
-                    TrackerSummary.date <= end_date
-                )
-            )
-            .order_by(TrackerSummary.date)
+        """Get all summaries for a user in [start_date, end_date], ordered by date"""
+        result = await self.session.execute(
+            _Q_PERIOD, {"uid": user_id, "start": start_date, "end": end_date}
         )
-        result = await self.session.execute(stmt)
         return list(result.scalars().all())
 
+    async def iter_summaries_for_period(
+        self,
+        user_id: int,
+        start_date: date,
+        end_date: date
+    ) -> AsyncIterator[TrackerSummary]:
+        """Stream summaries for a period in batches (for callers that only reduce over them)"""
+        result = await self.session.stream_scalars(
+            _Q_PERIOD_STREAM, {"uid": user_id, "start": start_date, "end": end_date}
+        )
+        async for summary in result:
+            yield summary
+
     async def get_last_n_summaries(
         self,
         user_id: int,
         limit: int = 7
     ) -> List[TrackerSummary]:
-        """
-        stmt = (
-            select(TrackerSummary)
-            .where(TrackerSummary.user_id == user_id)
-            .order_by(desc(TrackerSummary.date))
-            .limit(limit)
-        )
-        result = await self.session.execute(stmt)
+        """Get the latest `limit` summaries for a user, newest first"""
+        result = await self.session.execute(_Q_LAST_N, {"uid": user_id, "n": limit})
         return list(result.scalars().all())
 
     async def create_or_update(
@@ -76,35 +103,70 @@ class TrackerSummaryRepository:
         health: Optional[list] = None,
         summary_date: Optional[date] = None,
     ) -> TrackerSummary:
-        """Create or update TrackerSummary for a user"""
+        """Create or update TrackerSummary for a user (single INSERT ... ON CONFLICT)"""
         if summary_date is None:
-            from datetime import date as date_class
-            summary_date = date_class.today()
-
-        existing = await self.get_by_user_and_date(user_id, summary_date)
-
-        if existing:
-            if thinking is not None:
-                existing.thinking = thinking
-            if feeling is not None:
-                existing.feeling = feeling
-            if behavior is not None:
-                existing.behavior = behavior
-            if relationships is not None:
-                existing.relationships = relationships
-            if health is not None:
-                existing.health = health
-            return existing
-        else:
-            new_summary = TrackerSummary(
-                user_id=user_id,
-                thinking=thinking,
-                feeling=feeling,
-                behavior=behavior,
-                relationships=relationships,
-                health=health,
-                date=summary_date,
-            )
-            self.session.add(new_summary)
-            return new_summary
+            summary_date = date.today()
+
+        values = {
+            "thinking": thinking,
+            "feeling": feeling,
+            "behavior": behavior,
+            "relationships": relationships,
+            "health": health,
+        }
+        provided = {k: v for k, v in values.items() if v is not None}
+
+        stmt = pg_insert(TrackerSummary).values(
+            user_id=user_id, date=summary_date, **provided
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TrackerSummary.user_id, TrackerSummary.date],
+            set_={**provided, "updated_at": func.now()},
+        ).returning(TrackerSummary)
+
+        result = await self.session.execute(
+            stmt, execution_options={"populate_existing": True}
+        )
+        return result.scalar_one()
+
+    async def bulk_create_or_update(
+        self,
+        user_id: int,
+        rows: List[Dict[str, Any]],
+    ) -> List[TrackerSummary]:
+        """
+        Create or update several days in one multi-row INSERT ... ON CONFLICT.
+
+        Each row is a dict with "date" plus any category lists; as in
+        create_or_update, a missing/None category keeps the stored value.
+        Rows repeating a date are merged (later values win).
+        """
+        by_date: Dict[date, Dict[str, Any]] = {}
+        for row in rows:
+            merged = by_date.setdefault(row["date"], {})
+            for col in _CATEGORY_COLUMNS:
+                if row.get(col) is not None:
+                    merged[col] = row[col]
+        if not by_date:
+            return []
+
+        stmt = pg_insert(TrackerSummary).values([
+            {"user_id": user_id, "date": day, **{col: values.get(col) for col in _CATEGORY_COLUMNS}}
+            for day, values in by_date.items()
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TrackerSummary.user_id, TrackerSummary.date],
+            set_={
+                **{
+                    col: func.coalesce(getattr(stmt.excluded, col), getattr(TrackerSummary, col))
+                    for col in _CATEGORY_COLUMNS
+                },
+                "updated_at": func.now(),
+            },
+        ).returning(TrackerSummary)
+
+        result = await self.session.execute(
+            stmt, execution_options={"populate_existing": True}
+        )
+        return sorted(result.scalars().all(), key=lambda s: s.date)
 
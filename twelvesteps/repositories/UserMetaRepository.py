@@ -1,7 +1,8 @@
 """Repository for UserMeta operations"""
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from db.models import UserMeta
 
 
@@ -24,30 +25,24 @@ class UserMetaRepository:
         language: Optional[str] = None,
         data_flags: Optional[dict] = None,
     ) -> UserMeta:
-        """Create or update UserMeta for a user"""
-        existing = await self.get_by_user_id(user_id)
+        """Create or update UserMeta for a user (single INSERT ... ON CONFLICT)"""
+        values = {
+            "metasloy_signals": metasloy_signals,
+            "prompt_revision_history": prompt_revision_history,
+            "time_zone": time_zone,
+            "language": language,
+            "data_flags": data_flags,
+        }
+        provided = {k: v for k, v in values.items() if v is not None}
 
-        if existing:
-            if metasloy_signals is not None:
-                existing.metasloy_signals = metasloy_signals
-            if prompt_revision_history is not None:
-                existing.prompt_revision_history = prompt_revision_history
-            if time_zone is not None:
-                existing.time_zone = time_zone
-            if language is not None:
-                existing.language = language
-            if data_flags is not None:
-                existing.data_flags = data_flags
-            return existing
-        else:
-            new_meta = UserMeta(
-                user_id=user_id,
-                metasloy_signals=metasloy_signals,
-                prompt_revision_history=prompt_revision_history,
-                time_zone=time_zone,
-                language=language,
-                data_flags=data_flags,
-            )
-            self.session.add(new_meta)
-            return new_meta
+        stmt = pg_insert(UserMeta).values(user_id=user_id, **provided)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserMeta.user_id],
+            set_={**provided, "updated_at": func.now()},
+        ).returning(UserMeta)
+
+        result = await self.session.execute(
+            stmt, execution_options={"populate_existing": True}
+        )
+        return result.scalar_one()
 
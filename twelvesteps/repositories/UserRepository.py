@@ -1,9 +1,33 @@
-from datetime import datetime, timezone
+import time
+
+from cachetools import TTLCache
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, func
+from sqlalchemy import bindparam, select, update, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from db.models import User as UserModel, UserRole
 from typing import Optional
 
+# last_active is only used for coarse "seen recently" checks, so per-request
+# UPDATEs are debounced: a user's timestamp is written at most once per
+# LAST_ACTIVE_DEBOUNCE_SECONDS per process. Precision loss: the stored value
+# may lag the user's real last activity by up to that window (longer with
+# several workers, each keeping its own cache).
+LAST_ACTIVE_DEBOUNCE_SECONDS = 30
+_LAST_ACTIVE_CACHE: "TTLCache[int, float]" = TTLCache(maxsize=100_000, ttl=60)
+
+# Auth lookup runs on every request; built once and served by the unique
+# ix_users_api_key index.
+_Q_BY_API_KEY = select(UserModel).where(UserModel.api_key == bindparam("api_key"))
+
+# Everything the personalized prompt rebuild reads from the user row.
+_Q_PROMPT_PROFILE = select(
+    UserModel.display_name,
+    UserModel.program_experience,
+    UserModel.sobriety_date,
+    UserModel.personal_prompt,
+).where(UserModel.id == bindparam("user_id"))
+
+
 class UserRepository():
     def __init__(self, db : AsyncSession):
         self.db = db
@@ -39,39 +63,40 @@ class UserRepository():
         username: Optional[str] = None,
         first_name: Optional[str] = None,
     ) -> UserModel:
-        telegram_id = str(telegram_id)
-        session = self.db
-        user = await self.get_by_telegram_id(telegram_id)
-
-        if user is None:
-            print(f"Пользователь {telegram_id} не найден. Создаем нового.")
-            user = await self.add_user(
-                telegram_id=telegram_id,
-                username=username,
-                first_name=first_name,
-                user_role=UserRole.dependent
-            )
-            user.last_active = datetime.now(timezone.utc)
-            await session.commit()
-            print("Новый пользователь сохранен.")
-        else:
-            updated = False
-            if username and user.username != username:
-                user.username = username
-                updated = True
-            if first_name and user.first_name != first_name:
-                user.first_name = first_name
-                updated = True
+        """Insert the user or touch last_active in one INSERT ... ON CONFLICT.
 
-            user.last_active = datetime.now(timezone.utc)
-
-            await session.flush()
-            await session.commit()
-
-        return user
+        Empty username/first_name never overwrite stored values. The caller
+        commits.
+        """
+        telegram_id = str(telegram_id)
+        stmt = pg_insert(UserModel).values(
+            telegram_id=telegram_id,
+            username=username,
+            first_name=first_name,
+            display_name=first_name or username,
+            user_role=UserRole.dependent,
+            last_active=func.now(),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserModel.telegram_id],
+            set_={
+                "username": func.coalesce(func.nullif(stmt.excluded.username, ""), UserModel.username),
+                "first_name": func.coalesce(func.nullif(stmt.excluded.first_name, ""), UserModel.first_name),
+                "last_active": func.now(),
+                "updated_at": func.now(),
+            },
+        ).returning(UserModel)
+
+        result = await self.db.execute(
+            stmt, execution_options={"populate_existing": True}
+        )
+        return result.scalar_one()
 
     async def update_last_active(self, user_id: int) -> None:
-        """Update last_active timestamp for a user."""
+        """Update last_active timestamp for a user (debounced, see LAST_ACTIVE_DEBOUNCE_SECONDS)."""
+        now = time.monotonic()
+        if _LAST_ACTIVE_CACHE.get(user_id, 0) + LAST_ACTIVE_DEBOUNCE_SECONDS > now:
+            return
         stmt = update(UserModel).where(
             UserModel.id == user_id
         ).values(
@@ -79,6 +104,7 @@ class UserRepository():
         )
         await self.db.execute(stmt)
         await self.db.flush()
+        _LAST_ACTIVE_CACHE[user_id] = now
 
     async def get_personalized_prompt(self, user_id : int):
         query = select(UserModel).where(UserModel.id == user_id)
@@ -90,25 +116,28 @@ class UserRepository():
         else:
             return None
 
-    async def set_personalized_prompt(self, user_id : int, prompt_text : str) -> Optional[UserModel]:
-        query = await select(UserModel).where(UserModel.id == user_id)
-        result = await self.db.execute(query)
+    async def get_prompt_profile(self, user_id: int):
+        """Onboarding fields plus the stored prompt as one row (None if no such user)."""
+        result = await self.db.execute(_Q_PROMPT_PROFILE, {"user_id": user_id})
+        return result.one_or_none()
 
-        user = result.scalar_one_or_none()
-        if user:
-            user.personal_prompt = prompt_text
-            self.db.add(user)
-            await self.db.flush()
-            return user
-        else:
-            return None
+    async def set_personalized_prompt(self, user_id : int, prompt_text : str) -> Optional[UserModel]:
+        stmt = (
+            update(UserModel)
+            .where(UserModel.id == user_id)
+            .values(personal_prompt=prompt_text)
+            .returning(UserModel)
+        )
+        result = await self.db.execute(
+            stmt,
+            execution_options={"synchronize_session": False, "populate_existing": True},
+        )
+        return result.scalar_one_or_none()
 
     async def get_user_by_api_key(self, api_key: str) -> Optional[UserModel]:
         if not api_key:
             return None
-        query = select(UserModel).where(UserModel.api_key == api_key)
-        result = await self.db.execute(query)
-        return result.scalar_one_or_none()
+        return await self.db.scalar(_Q_BY_API_KEY, {"api_key": api_key})
 
     async def get_by_telegram_id(self, telegram_id) -> Optional[UserModel]:
         telegram_id = str(telegram_id)
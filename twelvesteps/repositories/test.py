@@ -2,12 +2,18 @@
 import os
 import tempfile
 import asyncio
+from functools import lru_cache
 
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from repositories.MessageRepository import MessageRepository
 
 
+@lru_cache(maxsize=None)
+def get_engine(db_url):
+    if db_url.startswith("sqlite"):
+        return create_async_engine(db_url, echo=False)
+    return create_async_engine(db_url, echo=False, pool_size=5, max_overflow=10, pool_pre_ping=True)
+
 
 async def run():
     db_url = os.environ.get("DATABASE_URL")
@@ -20,10 +26,8 @@ async def run():
         db_url = f"sqlite+aiosqlite:///{db_path}"
         using_temp_file = True
 
-    engine = create_async_engine(db_url, echo=False)
-
-
-    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    engine = get_engine(db_url)
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
     async with Session() as session:
         repo = MessageRepository(session)
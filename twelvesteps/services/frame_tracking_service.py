@@ -1,12 +1,122 @@
-"""Service for managing FrameTracking operations"""
+"""Service for managing FrameTracking operations.
+
+Methods only stage changes on the session; the caller owns the transaction
+and commits once per request.
+"""
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+import asyncio
+import hashlib
+import re
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Tuple
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.models import FrameTracking
-from repositories.FrameTrackingRepository import FrameTrackingRepository
+from repositories.FrameTrackingRepository import FrameEntry, FrameTrackingRepository
+
+
+# Read-only: _PATTERN_ARCHETYPES and _ARCHETYPE_RE are derived from it once
+# at import, so in-place edits would silently diverge from what is matched.
+ARCHETYPE_PATTERNS: Mapping[str, Tuple[str, ...]] = MappingProxyType({
+    "victim": ("жертва", "меня обидели", "несправедливо", "я не виноват"),
+    "rescuer": ("помогаю", "спасаю", "нужно помочь", "должен помочь"),
+    "judge": ("осуждаю", "неправильно", "должен", "обязан", "виноват"),
+    "persecutor": ("наказать", "виноват", "должен ответить"),
+})
+
+# Every pattern maps to each archetype with a pattern contained in it, so the
+# longest match at a position ("я не виноват") also reports the shorter ones
+# it covers ("виноват" -> judge, persecutor), same as a per-pattern `in` scan.
+_PATTERN_ARCHETYPES: Mapping[str, FrozenSet[str]] = {
+    pattern: frozenset(
+        archetype
+        for archetype, patterns in ARCHETYPE_PATTERNS.items()
+        if any(p in pattern for p in patterns)
+    )
+    for patterns in ARCHETYPE_PATTERNS.values()
+    for pattern in patterns
+}
+
+# Zero-width lookahead so matches may overlap; alternatives are longest-first.
+_ARCHETYPE_RE = re.compile(
+    "(?=(" + "|".join(
+        re.escape(p) for p in sorted(_PATTERN_ARCHETYPES, key=len, reverse=True)
+    ) + "))"
+)
+
+
+def _content_key(content: str) -> str:
+    """Short stable key for a frame's content, used in tracking["repetition_count"]."""
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _index_by_content(frames: Optional[List[FrameEntry]]) -> Dict[str, FrameEntry]:
+    """Index stored frames by content (insertion-ordered, so list order is kept)."""
+    return {frame["content"]: frame for frame in frames or []}
+
+
+def _confirmed_contents(tracking: FrameTracking) -> Tuple[Tuple[str, ...], FrozenSet[str]]:
+    """
+    Contents of confirmed frames (ordered, and as a set), memoized on the instance.
+
+    The memo is keyed on the identity of the `confirmed` list, so it goes stale
+    as soon as the attribute is reassigned (new value, refresh, reload).
+    """
+    confirmed = tracking.confirmed
+    cached = getattr(tracking, "_confirmed_contents_memo", None)
+    if cached is None or cached[0] is not confirmed:
+        contents = tuple(frame["content"] for frame in confirmed or [])
+        cached = (confirmed, contents, frozenset(contents))
+        tracking._confirmed_contents_memo = cached
+    return cached[1], cached[2]
+
+
+@lru_cache(maxsize=4096)
+def _lower(content: str) -> str:
+    # Confirmed frames never change, so the same contents come back on every
+    # detection; fold each one once per process instead of once per call.
+    return content.lower()
+
+
+def _detect_archetypes(contents: Tuple[str, ...]) -> List[str]:
+    """Archetypes whose patterns occur in the given frame contents (table order)."""
+    found = set()
+    for match in _ARCHETYPE_RE.finditer(" ".join(map(_lower, contents))):
+        found |= _PATTERN_ARCHETYPES[match.group(1)]
+        if len(found) == len(ARCHETYPE_PATTERNS):
+            break
+    return [a for a in ARCHETYPE_PATTERNS if a in found]
+
+
+# Below this many confirmed frames the scan takes microseconds and a thread
+# hop would cost more than it saves.
+_DETECT_INLINE_MAX_FRAMES = 64
+
+
+async def _detect_archetypes_offloaded(contents: Tuple[str, ...]) -> List[str]:
+    """_detect_archetypes, run in a worker thread for large histories."""
+    if len(contents) <= _DETECT_INLINE_MAX_FRAMES:
+        return _detect_archetypes(contents)
+    return await asyncio.to_thread(_detect_archetypes, contents)
+
+
+def _detect_meta_flags(confirmed: List[FrameEntry]) -> List[str]:
+    """Meta flags (loops, frame shifts) for the confirmed frames.
+
+    Only the count and the last three entries matter, so this stays constant
+    time however many frames are confirmed.
+    """
+    flags: List[str] = []
+    if len(confirmed) >= 3 and len({frame["content"] for frame in confirmed[-3:]}) == 1:
+        flags.append("loop_detected")
+    if len(confirmed) >= 2:
+        flags.append("frame_shift")
+    if len(confirmed) >= 5:
+        flags.append("identity_conflict")
+    return flags
 
 
 class FrameTrackingService:
@@ -27,8 +137,6 @@ class FrameTrackingService:
                 user_id=user_id,
                 tracking={"repetition_count": {}, "min_to_confirm": self.min_to_confirm}
             )
-            await self.session.commit()
-            await self.session.refresh(tracking)
         return tracking
 
     async def add_candidate(
@@ -37,104 +145,106 @@ class FrameTrackingService:
         frame_content: str,
         frame_data: Optional[Dict[str, Any]] = None
     ) -> FrameTracking:
-        """Add a candidate frame to tracking."""
-        tracking = await self.get_or_create_tracking(user_id)
+        """Add a candidate frame to tracking.
+
+        Reads the current row (if any), then writes the new state with one
+        INSERT ... ON CONFLICT (user_id) DO UPDATE ... RETURNING, so a first
+        candidate does not need a separate create. A repeat below the
+        confirmation threshold only updates the tracking counters.
+        """
+        tracking = await self.repo.get_by_user_id(user_id)
 
-        if not tracking.candidates:
-            tracking.candidates = []
-        if not tracking.tracking:
-            tracking.tracking = {"repetition_count": {}, "min_to_confirm": self.min_to_confirm}
-
-        repetition_count = tracking.tracking.get("repetition_count", {})
-        min_to_confirm = tracking.tracking.get("min_to_confirm", self.min_to_confirm)
-
-        candidate_found = False
-        for candidate in tracking.candidates:
-            if isinstance(candidate, dict) and candidate.get("content") == frame_content:
-                candidate_found = True
-                if frame_content not in repetition_count:
-                    repetition_count[frame_content] = 0
-                repetition_count[frame_content] += 1
-                break
-
-        if not candidate_found:
-            candidate_entry = {
+        # The JSON columns keep their list shape (it is part of the API);
+        # index them by content once so lookups and removal are O(1).
+        candidates = _index_by_content(tracking.candidates if tracking else None)
+        state = dict((tracking.tracking if tracking else None) or {"min_to_confirm": self.min_to_confirm})
+        repetition_count = dict(state.get("repetition_count", {}))
+        min_to_confirm = state.get("min_to_confirm", self.min_to_confirm)
+
+        # Counters are keyed by a 16-char hash rather than the full text (the
+        # content is already stored in the candidate entry); rows written
+        # before that are keyed by content and get migrated on first touch.
+        key = _content_key(frame_content)
+        legacy_count = repetition_count.pop(frame_content, 0)
+
+        was_candidate = frame_content in candidates
+        if was_candidate:
+            repetition_count[key] = repetition_count.get(key, legacy_count) + 1
+        else:
+            candidates[frame_content] = {
                 "content": frame_content,
                 "data": frame_data or {},
                 "first_seen": None
             }
-            tracking.candidates.append(candidate_entry)
-            repetition_count[frame_content] = 1
-
-        if repetition_count.get(frame_content, 0) >= min_to_confirm:
-            if not tracking.confirmed:
-                tracking.confirmed = []
+            repetition_count[key] = 1
 
-            confirmed_contents = [
-                c.get("content") if isinstance(c, dict) else str(c)
-                for c in tracking.confirmed
-            ]
-
-            if frame_content not in confirmed_contents:
-                confirmed_entry = {
+        confirmed = None
+        if repetition_count[key] >= min_to_confirm:
+            _, confirmed_set = _confirmed_contents(tracking) if tracking else ((), frozenset())
+            if frame_content not in confirmed_set:
+                confirmed = [*((tracking.confirmed if tracking else None) or []), {
                     "content": frame_content,
                     "data": frame_data or {},
                     "confirmed_at": None
-                }
-                tracking.confirmed.append(confirmed_entry)
-
-                tracking.candidates = [
-                    c for c in tracking.candidates
-                    if (isinstance(c, dict) and c.get("content") != frame_content)
-                    or (not isinstance(c, dict) and str(c) != frame_content)
-                ]
-
-        tracking.tracking["repetition_count"] = repetition_count
-        await self.session.commit()
-        await self.session.refresh(tracking)
+                }]
+                del candidates[frame_content]
+
+        state["repetition_count"] = repetition_count
+
+        if tracking is not None and was_candidate and confirmed is None:
+            # Only the counter moved: candidates/confirmed are unchanged, so
+            # write just the tracking JSON and skip re-reading the row.
+            return await self.repo.update_tracking_state(tracking, state)
+
+        return await self.repo.create_or_update(
+            user_id=user_id,
+            candidates=list(candidates.values()),
+            confirmed=confirmed,
+            tracking=state,
+        )
+
+    async def process_frame(
+        self,
+        user_id: int,
+        frame_content: str,
+        frame_data: Optional[Dict[str, Any]] = None
+    ) -> FrameTracking:
+        """
+        Add a candidate frame and refresh archetypes and meta flags in one go.
+
+        Equivalent to add_candidate + detect_archetypes + detect_meta_flags,
+        but the row is loaded once and detection runs on the upserted state.
+        """
+        tracking = await self.add_candidate(user_id, frame_content, frame_data)
+
+        if tracking.confirmed:
+            contents, _ = _confirmed_contents(tracking)
+            archetypes = await _detect_archetypes_offloaded(contents)
+            if archetypes != (tracking.archetypes or []):
+                tracking.archetypes = archetypes
+            flags = _detect_meta_flags(tracking.confirmed)
+            if flags != (tracking.meta_flags or []):
+                tracking.meta_flags = flags
+
         return tracking
 
     async def detect_archetypes(
         self,
         user_id: int
     ) -> List[str]:
-        """
+        """Detect drama-triangle archetypes in the user's confirmed frames."""
         tracking = await self.get_or_create_tracking(user_id)
 
         if not tracking.confirmed:
             return []
 
-        archetypes = []
-        confirmed_contents = []
-
-        for frame in tracking.confirmed:
-            if isinstance(frame, dict):
-                content = frame.get("content", "")
-            else:
-                content = str(frame)
-            confirmed_contents.append(content.lower())
-
-        all_text = " ".join(confirmed_contents)
-
-        victim_patterns = ["жертва", "меня обидели", "несправедливо", "я не виноват"]
-        if any(pattern in all_text for pattern in victim_patterns):
-            archetypes.append("victim")
-
-        rescuer_patterns = ["помогаю", "спасаю", "нужно помочь", "должен помочь"]
-        if any(pattern in all_text for pattern in rescuer_patterns):
-            archetypes.append("rescuer")
+        contents, _ = _confirmed_contents(tracking)
+        archetypes = await _detect_archetypes_offloaded(contents)
 
-        judge_patterns = ["осуждаю", "неправильно", "должен", "обязан", "виноват"]
-        if any(pattern in all_text for pattern in judge_patterns):
-            archetypes.append("judge")
-
-        persecutor_patterns = ["наказать", "виноват", "должен ответить"]
-        if any(pattern in all_text for pattern in persecutor_patterns):
-            archetypes.append("persecutor")
-
-        tracking.archetypes = list(set(archetypes))
-        await self.session.commit()
-        await self.session.refresh(tracking)
+        # Only touch the column when the result changed, so steady-state
+        # re-detection does not emit an UPDATE.
+        if archetypes != (tracking.archetypes or []):
+            tracking.archetypes = archetypes
 
         return archetypes
 
@@ -142,31 +252,16 @@ class FrameTrackingService:
         self,
         user_id: int
     ) -> List[str]:
-        """
+        """Detect meta flags (loops, frame shifts) from confirmed frames."""
         tracking = await self.get_or_create_tracking(user_id)
 
-        flags = []
-
         if not tracking.confirmed:
-            return flags
-
-        if len(tracking.confirmed) >= 3:
-            recent_contents = [
-                c.get("content", "") if isinstance(c, dict) else str(c)
-                for c in tracking.confirmed[-3:]
-            ]
-            if len(set(recent_contents)) == 1:
-                flags.append("loop_detected")
-
-        if len(tracking.confirmed) >= 2:
-            flags.append("frame_shift")
+            return []
 
-        if len(tracking.confirmed) >= 5:
-            flags.append("identity_conflict")
+        flags = _detect_meta_flags(tracking.confirmed)
 
-        tracking.meta_flags = list(set(flags))
-        await self.session.commit()
-        await self.session.refresh(tracking)
+        if flags != (tracking.meta_flags or []):
+            tracking.meta_flags = flags
 
         return flags
 
@@ -178,12 +273,8 @@ class FrameTrackingService:
         """Set minimum repetitions required to confirm a frame"""
         tracking = await self.get_or_create_tracking(user_id)
 
-        if not tracking.tracking:
-            tracking.tracking = {"repetition_count": {}, "min_to_confirm": min_count}
-        else:
-            tracking.tracking["min_to_confirm"] = min_count
-
-        await self.session.commit()
-        await self.session.refresh(tracking)
+        state = dict(tracking.tracking or {"repetition_count": {}})
+        state["min_to_confirm"] = min_count
+        tracking.tracking = state
         return tracking
 
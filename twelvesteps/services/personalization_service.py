@@ -1,5 +1,8 @@
 """Service for building personalized prompt from all user answers."""
-from typing import Optional
+import asyncio
+import logging
+from types import MappingProxyType
+from typing import Dict, Optional, Set
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, update, desc
 from db.models import (
@@ -7,198 +10,288 @@ from db.models import (
     StepAnswer, Question, Step, Message, SenderRole, Gratitude,
     Step10DailyAnalysis, Step10AnalysisStatus
 )
+from db.database import async_session_factory
 from repositories.UserRepository import UserRepository
 
+logger = logging.getLogger(__name__)
+
+# Chat turns coalesce their rebuilds into one per user per window.
+PERSONALIZATION_REFRESH_DELAY_SECONDS = 30
+
+# One refresh task per user (kept until its rebuild finishes), every task
+# still alive, users with a rebuild requested since the last pass started,
+# and the shutdown signal that ends the debounce wait early.
+_pending_refreshes: Dict[int, asyncio.Task] = {}
+_refresh_tasks: Set[asyncio.Task] = set()
+_refresh_requested: Set[int] = set()
+_refresh_drain = asyncio.Event()
+
+# Generated sections of the stored prompt (plus the bot instruction); all of
+# them are dropped and rebuilt on every update.
+_GENERATED_SECTION_HEADERS = tuple(
+    f"=== {title}" for title in (
+        "ДАННЫЕ ОНБОРДИНГА", "ИНФОРМАЦИЯ ИЗ ПРОФИЛЯ", "ОТВЕТЫ ПО ШАГАМ", "БЛАГОДАРНОСТИ",
+        "ЕЖЕДНЕВНЫЙ САМОАНАЛИЗ", "ИНФОРМАЦИЯ ИЗ ОБЫЧНОГО ОБЩЕНИЯ", "ИНСТРУКЦИЯ ДЛЯ БОТА",
+    )
+)
 
-async def update_personalized_prompt_from_all_answers(session: AsyncSession, user_id: int) -> None:
-    """Update personalized prompt from all user answers."""
-    user_repo = UserRepository(session)
-    personalized_prompt = await user_repo.get_personalized_prompt(user_id) or ""
-
-    from sqlalchemy import select
-    from db.models import User
-    user_stmt = select(User).where(User.id == user_id)
-    user_result = await session.execute(user_stmt)
-    user = user_result.scalar_one_or_none()
-
-    import re
-    personalized_prompt = re.sub(
-        r'=== ДАННЫЕ ОНБОРДИНГА.*?===.*?(?=\n\n===|\Z)',
-        '',
-        personalized_prompt,
-        flags=re.DOTALL
-    ).strip()
-    personalized_prompt = re.sub(
-        r'=== ИНФОРМАЦИЯ ИЗ ПРОФИЛЯ.*?===.*?(?=\n\n===|\Z)',
-        '',
-        personalized_prompt,
-        flags=re.DOTALL
-    ).strip()
-    personalized_prompt = re.sub(
-        r'=== ОТВЕТЫ ПО ШАГАМ.*?===.*?(?=\n\n===|\Z)',
-        '',
-        personalized_prompt,
-        flags=re.DOTALL
-    ).strip()
-    personalized_prompt = re.sub(
-        r'=== БЛАГОДАРНОСТИ.*?===.*?(?=\n\n===|\Z)',
-        '',
-        personalized_prompt,
-        flags=re.DOTALL
-    ).strip()
-    personalized_prompt = re.sub(
-        r'=== ЕЖЕДНЕВНЫЙ САМОАНАЛИЗ.*?===.*?(?=\n\n===|\Z)',
-        '',
-        personalized_prompt,
-        flags=re.DOTALL
-    ).strip()
-    personalized_prompt = re.sub(
-        r'=== ИНФОРМАЦИЯ ИЗ ОБЫЧНОГО ОБЩЕНИЯ.*?===.*?(?=\n\n===|\Z)',
-        '',
-        personalized_prompt,
-        flags=re.DOTALL
-    ).strip()
-
-    onboarding_summary = "=== ДАННЫЕ ОНБОРДИНГА (СТАРТОВАЯ ИНФОРМАЦИЯ) ===\n\n"
-
-    if user:
-        if user.display_name:
-            onboarding_summary += f"Имя: {user.display_name}\n"
-
-        if user.program_experience:
-            experience_map = {
-                "NEWBIE": "Новичок",
-                "SOME_EXPERIENCE": "Есть немного опыта",
-                "LONG_TERM": "Бывалый / Давно в программе"
-            }
-            experience_display = experience_map.get(user.program_experience, user.program_experience)
-            onboarding_summary += f"Опыт работы с программой: {experience_display}\n"
-
-        if user.sobriety_date:
-            onboarding_summary += f"Дата трезвости: {user.sobriety_date}\n"
 
-        if not user.display_name and not user.program_experience and not user.sobriety_date:
-            onboarding_summary += "Пользователь еще не прошел онбординг.\n"
-    else:
-        onboarding_summary += "Пользователь не найден.\n"
+def _strip_generated_sections(prompt: str) -> str:
+    """Remove generated sections from a stored prompt using plain substring search.
+
+    A section runs from its "=== TITLE ... ===" header up to the next blank
+    line followed by "===", or to the end of the text.
+    """
+    kept = []
+    pos = 0
+    i = prompt.find("=== ")
+    while i >= 0:
+        if prompt.startswith(_GENERATED_SECTION_HEADERS, i):
+            header_end = prompt.find("===", i + 4)
+            if header_end < 0:
+                break
+            end = prompt.find("\n\n===", header_end + 3)
+            if end < 0:
+                end = len(prompt)
+            kept.append(prompt[pos:i])
+            pos = end
+            i = prompt.find("=== ", end)
+        else:
+            i = prompt.find("=== ", i + 4)
+    kept.append(prompt[pos:])
+    return "".join(kept).strip()
+
+_EXPERIENCE_MAP = MappingProxyType({
+    "NEWBIE": "Новичок",
+    "SOME_EXPERIENCE": "Есть немного опыта",
+    "LONG_TERM": "Бывалый / Давно в программе"
+})
+
+
+def _emit_section_header(
+    parts: list, current_section: Optional[str], section_name: str, processed_sections: set
+) -> str:
+    """Switch the profile output to section_name and return it as the current section.
+
+    Sections are separated by a blank line; the "[name]" header is written only
+    the first time a section appears, so free-text data for a section already
+    listed with exact answers continues under the same header.
+    """
+    if section_name == current_section:
+        return current_section
+    if current_section is not None:
+        parts.append("\n")
+    if section_name not in processed_sections:
+        parts.append(f"[{section_name}]\n")
+        processed_sections.add(section_name)
+    return section_name
 
-    onboarding_summary += "\n"
 
-    profile_summary = "=== ИНФОРМАЦИЯ ИЗ ПРОФИЛЯ ПОЛЬЗОВАТЕЛЯ (ТОЧНЫЕ ОТВЕТЫ) ===\n\n"
+async def update_personalized_prompt_from_all_answers(session: AsyncSession, user_id: int) -> None:
+    """Update personalized prompt from all user answers.
 
-    max_version_subq = (
-        select(
-            ProfileAnswer.question_id,
-            func.max(ProfileAnswer.version).label('max_version')
-        )
+    All reads run on the caller's session, so answers the caller has added
+    but not yet committed are included. The function always ends with
+    ``session.commit()``, which also commits anything else the caller has
+    pending; callers rely on that to persist the answer they just saved.
+    """
+    user_repo = UserRepository(session)
+    user = await user_repo.get_prompt_profile(user_id)
+    stored_prompt = (user.personal_prompt if user else None) or ""
+
+    # Latest version of each answer: DISTINCT ON walks the
+    # (user_id, question_id, version) unique index instead of a GROUP BY
+    # plus self-join.
+    latest_answers_subq = (
+        select(ProfileAnswer.question_id, ProfileAnswer.answer_text)
         .where(ProfileAnswer.user_id == user_id)
-        .group_by(ProfileAnswer.question_id)
+        .distinct(ProfileAnswer.question_id)
+        .order_by(ProfileAnswer.question_id, desc(ProfileAnswer.version))
     ).subquery()
 
     profile_answers_stmt = (
         select(
-            ProfileAnswer.answer_text,
+            latest_answers_subq.c.answer_text,
             ProfileQuestion.question_text,
             ProfileSection.name.label('section_name'),
             ProfileSection.order_index
         )
-        .join(ProfileQuestion, ProfileAnswer.question_id == ProfileQuestion.id)
+        .join(ProfileQuestion, latest_answers_subq.c.question_id == ProfileQuestion.id)
         .join(ProfileSection, ProfileQuestion.section_id == ProfileSection.id)
-        .join(
-            max_version_subq,
-            (ProfileAnswer.question_id == max_version_subq.c.question_id) &
-            (ProfileAnswer.version == max_version_subq.c.max_version)
-        )
-        .where(ProfileAnswer.user_id == user_id)
         .order_by(ProfileSection.order_index, ProfileQuestion.id)
     )
-    profile_answers_result = await session.execute(profile_answers_stmt)
-    profile_answers = profile_answers_result.all()
 
-    processed_sections = set()
-    current_section = None
-
-    if profile_answers:
-        for answer_text, question_text, section_name, _ in profile_answers:
-            if current_section != section_name:
-                if current_section is not None:
-                    profile_summary += "\n"
-                profile_summary += f"[{section_name}]\n"
-                current_section = section_name
-                processed_sections.add(section_name)
-            profile_summary += f"Вопрос: {question_text}\n"
-            profile_summary += f"Ответ: {answer_text}\n\n"
-
-    free_text_data_stmt = (
+    # Only the top three entries of each subblock are rendered, so rank them in
+    # SQL and ship just those rows; subblock_total feeds the "... и ещё N" lines.
+    subblock_key = func.coalesce(func.nullif(ProfileSectionData.subblock_name, ''), 'general')
+    entry_rank_order = (
+        desc(ProfileSectionData.is_core_personality),
+        desc(func.coalesce(ProfileSectionData.importance, 1.0)),
+        ProfileSectionData.created_at.desc().nulls_last(),
+    )
+    ranked_data_subq = (
         select(
             ProfileSectionData.content,
-            ProfileSectionData.subblock_name,
+            subblock_key.label('subblock_name'),
             ProfileSectionData.entity_type,
             ProfileSectionData.importance,
             ProfileSectionData.is_core_personality,
             ProfileSectionData.tags,
             ProfileSectionData.created_at,
             ProfileSection.name.label('section_name'),
-            ProfileSection.order_index
+            ProfileSection.order_index,
+            func.row_number().over(
+                partition_by=(ProfileSectionData.section_id, subblock_key),
+                order_by=entry_rank_order
+            ).label('rn'),
+            func.count().over(
+                partition_by=(ProfileSectionData.section_id, subblock_key)
+            ).label('subblock_total'),
         )
         .join(ProfileSection, ProfileSectionData.section_id == ProfileSection.id)
-        .where(ProfileSectionData.user_id == user_id)
+        .where(
+            ProfileSectionData.user_id == user_id,
+            func.btrim(ProfileSectionData.content, ' \t\r\n') != ''
+        )
+    ).subquery()
+
+    free_text_data_stmt = (
+        select(
+            ranked_data_subq.c.content,
+            ranked_data_subq.c.subblock_name,
+            ranked_data_subq.c.entity_type,
+            ranked_data_subq.c.importance,
+            ranked_data_subq.c.is_core_personality,
+            ranked_data_subq.c.tags,
+            ranked_data_subq.c.section_name,
+            ranked_data_subq.c.order_index,
+            ranked_data_subq.c.subblock_total,
+        )
+        .where(ranked_data_subq.c.rn <= 3)
         .order_by(
-            ProfileSection.order_index,
-            desc(ProfileSectionData.is_core_personality),
-            desc(ProfileSectionData.importance),
-            desc(ProfileSectionData.created_at)
+            ranked_data_subq.c.order_index,
+            desc(ranked_data_subq.c.is_core_personality),
+            desc(func.coalesce(ranked_data_subq.c.importance, 1.0)),
+            ranked_data_subq.c.created_at.desc().nulls_last()
+        )
+    )
+
+    step_answers_stmt = (
+        select(
+            StepAnswer.answer_text,
+            Question.text.label('question_text'),
+            Step.index.label('step_number'),
+            Step.title.label('step_title'),
+            StepAnswer.created_at
+        )
+        .join(Question, StepAnswer.question_id == Question.id)
+        .join(Step, StepAnswer.step_id == Step.id)
+        .where(StepAnswer.user_id == user_id)
+        .order_by(Step.index, Question.id, StepAnswer.created_at)
+    )
+
+    gratitudes_stmt = (
+        select(Gratitude.text, Gratitude.created_at)
+        .where(Gratitude.user_id == user_id)
+        .order_by(desc(Gratitude.created_at))
+        .limit(20)
+    )
+
+    step10_analyses_stmt = (
+        select(Step10DailyAnalysis.analysis_date, Step10DailyAnalysis.answers)
+        .where(
+            Step10DailyAnalysis.user_id == user_id,
+            Step10DailyAnalysis.status == Step10AnalysisStatus.COMPLETED
         )
+        .order_by(desc(Step10DailyAnalysis.analysis_date))
+        .limit(10)
     )
-    free_text_data_result = await session.execute(free_text_data_stmt)
-    free_text_data = free_text_data_result.all()
+
+    chat_messages_stmt = (
+        select(Message.content, Message.created_at)
+        .where(
+            Message.user_id == user_id,
+            Message.sender_role == SenderRole.user
+        )
+        .order_by(desc(Message.created_at))
+        .limit(20)
+    )
+
+    profile_answers = (await session.execute(profile_answers_stmt)).all()
+    free_text_data = (await session.execute(free_text_data_stmt)).all()
+    step_answers = (await session.execute(step_answers_stmt)).all()
+    gratitudes = (await session.execute(gratitudes_stmt)).all()
+    step10_analyses = (await session.execute(step10_analyses_stmt)).all()
+    chat_messages = (await session.execute(chat_messages_stmt)).all()
+
+    personalized_prompt = _strip_generated_sections(stored_prompt)
+
+    onboarding_parts = ["=== ДАННЫЕ ОНБОРДИНГА (СТАРТОВАЯ ИНФОРМАЦИЯ) ===\n\n"]
+
+    if user:
+        if user.display_name:
+            onboarding_parts.append(f"Имя: {user.display_name}\n")
+
+        if user.program_experience:
+            experience_display = _EXPERIENCE_MAP.get(user.program_experience, user.program_experience)
+            onboarding_parts.append(f"Опыт работы с программой: {experience_display}\n")
+
+        if user.sobriety_date:
+            onboarding_parts.append(f"Дата трезвости: {user.sobriety_date}\n")
+
+        if not user.display_name and not user.program_experience and not user.sobriety_date:
+            onboarding_parts.append("Пользователь еще не прошел онбординг.\n")
+    else:
+        onboarding_parts.append("Пользователь не найден.\n")
+
+    onboarding_parts.append("\n")
+
+    profile_parts = ["=== ИНФОРМАЦИЯ ИЗ ПРОФИЛЯ ПОЛЬЗОВАТЕЛЯ (ТОЧНЫЕ ОТВЕТЫ) ===\n\n"]
+
+    processed_sections = set()
+    current_section = None
+
+    if profile_answers:
+        for answer_text, question_text, section_name, _ in profile_answers:
+            current_section = _emit_section_header(
+                profile_parts, current_section, section_name, processed_sections
+            )
+            profile_parts.append(f"Вопрос: {question_text}\n")
+            profile_parts.append(f"Ответ: {answer_text}\n\n")
 
     if free_text_data:
         section_data_map = {}
         for row in free_text_data:
-            content, subblock_name, entity_type, importance, is_core, tags, created_at, section_name, order_idx = row
-            if not content or len(content.strip()) == 0:
-                continue
+            content, subblock_name, entity_type, importance, is_core, tags, section_name, order_idx, total = row
 
             if section_name not in section_data_map:
                 section_data_map[section_name] = {
                     'order_index': order_idx,
-                    'subblocks': {}
+                    'subblocks': {},
+                    'totals': {}
                 }
 
-            subblock_key = subblock_name or "general"
-            if subblock_key not in section_data_map[section_name]['subblocks']:
-                section_data_map[section_name]['subblocks'][subblock_key] = []
+            if subblock_name not in section_data_map[section_name]['subblocks']:
+                section_data_map[section_name]['subblocks'][subblock_name] = []
+                section_data_map[section_name]['totals'][subblock_name] = total
 
-            section_data_map[section_name]['subblocks'][subblock_key].append({
+            section_data_map[section_name]['subblocks'][subblock_name].append({
                 'content': content,
                 'entity_type': entity_type,
                 'importance': importance,
                 'is_core_personality': is_core,
-                'tags': tags,
-                'created_at': created_at
+                'tags': tags
             })
 
         sorted_sections = sorted(section_data_map.items(), key=lambda x: x[1]['order_index'])
 
         for section_name, section_info in sorted_sections:
-            if section_name not in processed_sections:
-                if current_section is not None:
-                    profile_summary += "\n"
-                profile_summary += f"[{section_name}]\n"
-                current_section = section_name
-                processed_sections.add(section_name)
-            elif current_section != section_name:
-                if current_section is not None:
-                    profile_summary += "\n"
-                current_section = section_name
+            current_section = _emit_section_header(
+                profile_parts, current_section, section_name, processed_sections
+            )
 
             for subblock_name, entries in section_info['subblocks'].items():
-                entries.sort(key=lambda e: (
-                    not e['is_core_personality'],
-                    -(e['importance'] or 1.0),
-                    -(e['created_at'].timestamp() if e['created_at'] else 0)
-                ))
+                total = section_info['totals'][subblock_name]
 
                 current_entries = []
                 historical_entries = []
@@ -208,20 +301,20 @@ async def update_personalized_prompt_from_all_answers(session: AsyncSession, use
                     historical_entries = entries[1:]
 
                 if subblock_name != "general":
-                    profile_summary += f"  • {subblock_name}"
+                    profile_parts.append(f"  • {subblock_name}")
                     if entries[0].get('entity_type'):
-                        profile_summary += f" ({entries[0]['entity_type']})"
-                    profile_summary += ":\n"
+                        profile_parts.append(f" ({entries[0]['entity_type']})")
+                    profile_parts.append(":\n")
 
                     if current_entries:
                         entry = current_entries[0]
                         content = entry['content']
-                        profile_summary += f"    Сейчас: {content}"
+                        profile_parts.append(f"    Сейчас: {content}")
                         if entry.get('is_core_personality'):
-                            profile_summary += " [ядро личности]"
+                            profile_parts.append(" [ядро личности]")
                         if entry.get('tags'):
-                            profile_summary += f" [теги: {entry['tags']}]"
-                        profile_summary += "\n"
+                            profile_parts.append(f" [теги: {entry['tags']}]")
+                        profile_parts.append("\n")
 
                     if historical_entries:
                         historical_sorted = sorted(
@@ -230,139 +323,99 @@ async def update_personalized_prompt_from_all_answers(session: AsyncSession, use
                         )
                         if len(historical_sorted) == 1:
                             entry = historical_sorted[0]
-                            profile_summary += f"    Ранее: {entry['content']}"
+                            profile_parts.append(f"    Ранее: {entry['content']}")
                             if entry.get('is_core_personality'):
-                                profile_summary += " [ядро личности]"
-                            profile_summary += "\n"
+                                profile_parts.append(" [ядро личности]")
+                            profile_parts.append("\n")
                         elif len(historical_sorted) > 1:
-                            profile_summary += "    Ранее: "
+                            profile_parts.append("    Ранее: ")
                             historical_texts = []
                             for entry in historical_sorted:
                                 historical_texts.append(entry['content'])
-                            profile_summary += ", ".join(historical_texts)
+                            profile_parts.append(", ".join(historical_texts))
                             if any(e.get('is_core_personality') for e in historical_sorted):
-                                profile_summary += " [ядро личности]"
-                            profile_summary += "\n"
+                                profile_parts.append(" [ядро личности]")
+                            profile_parts.append("\n")
 
-                        if len(historical_entries) > 2:
-                            profile_summary += f"    ... и ещё {len(historical_entries) - 2} исторических записей\n"
+                        if total > 3:
+                            profile_parts.append(f"    ... и ещё {total - 3} исторических записей\n")
                 else:
                     for entry in entries[:3]:
                         content = entry['content']
-                        profile_summary += f"  - {content}"
+                        profile_parts.append(f"  - {content}")
                         if entry.get('is_core_personality'):
-                            profile_summary += " [ядро личности]"
+                            profile_parts.append(" [ядро личности]")
                         if entry.get('tags'):
-                            profile_summary += f" [теги: {entry['tags']}]"
-                        profile_summary += "\n"
+                            profile_parts.append(f" [теги: {entry['tags']}]")
+                        profile_parts.append("\n")
 
-                    if len(entries) > 3:
-                        profile_summary += f"  ... и ещё {len(entries) - 3} записей\n"
+                    if total > 3:
+                        profile_parts.append(f"  ... и ещё {total - 3} записей\n")
 
     if not profile_answers and not free_text_data:
-        profile_summary += "Пользователь еще не заполнил профиль.\n\n"
+        profile_parts.append("Пользователь еще не заполнил профиль.\n\n")
 
-    steps_summary = "=== ОТВЕТЫ ПО ШАГАМ (РАБОТА ПО ПРОГРАММЕ) ===\n\n"
-
-    step_answers_stmt = (
-        select(
-            StepAnswer.answer_text,
-            Question.text.label('question_text'),
-            Step.index.label('step_number'),
-            Step.title.label('step_title'),
-            StepAnswer.created_at
-        )
-        .join(Question, StepAnswer.question_id == Question.id)
-        .join(Step, StepAnswer.step_id == Step.id)
-        .where(StepAnswer.user_id == user_id)
-        .order_by(Step.index, Question.id, StepAnswer.created_at)
-    )
-    step_answers_result = await session.execute(step_answers_stmt)
-    step_answers = step_answers_result.all()
+    steps_parts = ["=== ОТВЕТЫ ПО ШАГАМ (РАБОТА ПО ПРОГРАММЕ) ===\n\n"]
 
     if step_answers:
         current_step = None
         for answer_text, question_text, step_number, step_title, created_at in step_answers:
             if current_step != step_number:
                 if current_step is not None:
-                    steps_summary += "\n"
+                    steps_parts.append("\n")
                 step_title_display = step_title or f"Шаг {step_number}"
-                steps_summary += f"[{step_title_display} (Шаг {step_number})]\n"
+                steps_parts.append(f"[{step_title_display} (Шаг {step_number})]\n")
                 current_step = step_number
-            steps_summary += f"Вопрос: {question_text}\n"
-            steps_summary += f"Ответ: {answer_text}\n\n"
+            steps_parts.append(f"Вопрос: {question_text}\n")
+            steps_parts.append(f"Ответ: {answer_text}\n\n")
     else:
-        steps_summary += "Пользователь еще не начал работу по шагам.\n\n"
-
-    gratitudes_stmt = (
-        select(Gratitude.text, Gratitude.created_at)
-        .where(Gratitude.user_id == user_id)
-        .order_by(desc(Gratitude.created_at))
-        .limit(20)
-    )
-    gratitudes_result = await session.execute(gratitudes_stmt)
-    gratitudes = gratitudes_result.all()
+        steps_parts.append("Пользователь еще не начал работу по шагам.\n\n")
 
-    gratitudes_summary = "=== БЛАГОДАРНОСТИ ===\n\n"
+    gratitudes_parts = ["=== БЛАГОДАРНОСТИ ===\n\n"]
     if gratitudes:
-        gratitudes_summary += "Записи благодарностей пользователя:\n"
+        gratitudes_parts.append("Записи благодарностей пользователя:\n")
         for text, created_at in gratitudes:
-            gratitudes_summary += f"- {text}\n"
+            gratitudes_parts.append(f"- {text}\n")
     else:
-        gratitudes_summary += "Пользователь еще не записывал благодарности.\n\n"
+        gratitudes_parts.append("Пользователь еще не записывал благодарности.\n\n")
 
-    step10_summary = "=== ЕЖЕДНЕВНЫЙ САМОАНАЛИЗ (ШАГ 10) ===\n\n"
-
-    step10_analyses_stmt = (
-        select(Step10DailyAnalysis)
-        .where(
-            Step10DailyAnalysis.user_id == user_id,
-            Step10DailyAnalysis.status == Step10AnalysisStatus.COMPLETED
-        )
-        .order_by(desc(Step10DailyAnalysis.analysis_date))
-        .limit(10)
-    )
-    step10_analyses_result = await session.execute(step10_analyses_stmt)
-    step10_analyses = step10_analyses_result.scalars().all()
+    step10_parts = ["=== ЕЖЕДНЕВНЫЙ САМОАНАЛИЗ (ШАГ 10) ===\n\n"]
 
     if step10_analyses:
-        step10_summary += "Записи ежедневного самоанализа:\n\n"
-        for analysis in step10_analyses:
-            if analysis.answers:
-                date_str = analysis.analysis_date.strftime("%d.%m.%Y") if analysis.analysis_date else ""
-                step10_summary += f"[{date_str}]\n"
-                for answer_entry in analysis.answers:
+        step10_parts.append("Записи ежедневного самоанализа:\n\n")
+        for analysis_date, answers in step10_analyses:
+            if answers:
+                date_str = analysis_date.strftime("%d.%m.%Y") if analysis_date else ""
+                step10_parts.append(f"[{date_str}]\n")
+                # answers is keyed by question number; older rows stored a list
+                entries = answers.values() if isinstance(answers, dict) else answers
+                for answer_entry in sorted(entries, key=lambda a: int(a.get("question_number", 0))):
                     q_num = answer_entry.get("question_number", 0)
                     answer_text = answer_entry.get("answer", "")
                     if answer_text:
-                        step10_summary += f"Вопрос {q_num}: {answer_text}\n"
-                step10_summary += "\n"
+                        step10_parts.append(f"Вопрос {q_num}: {answer_text}\n")
+                step10_parts.append("\n")
     else:
-        step10_summary += "Пользователь еще не проходил ежедневный самоанализ.\n\n"
+        step10_parts.append("Пользователь еще не проходил ежедневный самоанализ.\n\n")
 
-    chat_summary = "=== ИНФОРМАЦИЯ ИЗ ОБЫЧНОГО ОБЩЕНИЯ ===\n\n"
-
-    chat_messages_stmt = (
-        select(Message.content, Message.created_at)
-        .where(
-            Message.user_id == user_id,
-            Message.sender_role == SenderRole.user
-        )
-        .order_by(desc(Message.created_at))
-        .limit(20)
-    )
-    chat_messages_result = await session.execute(chat_messages_stmt)
-    chat_messages = chat_messages_result.all()
+    chat_parts = ["=== ИНФОРМАЦИЯ ИЗ ОБЫЧНОГО ОБЩЕНИЯ ===\n\n"]
 
     if chat_messages:
-        chat_summary += "Ключевые темы и информация из общения с пользователем:\n\n"
+        chat_parts.append("Ключевые темы и информация из общения с пользователем:\n\n")
         for content, created_at in chat_messages[:10]:
             if content and len(content.strip()) > 10:
                 content_preview = content[:200] + "..." if len(content) > 200 else content
-                chat_summary += f"- {content_preview}\n"
-        chat_summary += "\n"
+                chat_parts.append(f"- {content_preview}\n")
+        chat_parts.append("\n")
     else:
-        chat_summary += "Пользователь еще не общался в обычном режиме.\n\n"
+        chat_parts.append("Пользователь еще не общался в обычном режиме.\n\n")
+
+    onboarding_summary = "".join(onboarding_parts)
+    profile_summary = "".join(profile_parts)
+    steps_summary = "".join(steps_parts)
+    gratitudes_summary = "".join(gratitudes_parts)
+    step10_summary = "".join(step10_parts)
+    chat_summary = "".join(chat_parts)
 
     complete_profile = f"{onboarding_summary}\n{profile_summary}\n\n{steps_summary}\n\n{gratitudes_summary}\n\n{step10_summary}\n\n{chat_summary}"
 
@@ -373,22 +426,58 @@ async def update_personalized_prompt_from_all_answers(session: AsyncSession, use
 Ссылайся на предыдущие ответы пользователя, когда это уместно."""
 
     if personalized_prompt:
-        personalized_prompt = re.sub(
-            r'=== ИНСТРУКЦИЯ ДЛЯ БОТА.*?===.*?(?=\n\n===|\Z)',
-            '',
-            personalized_prompt,
-            flags=re.DOTALL
-        ).strip()
-
         new_prompt_text = f"{personalized_prompt}\n\n{instruction}\n\n{complete_profile}"
     else:
         new_prompt_text = f"{instruction}\n\n{complete_profile}"
 
-    stmt = (
-        update(User)
-        .where(User.id == user_id)
-        .values(personal_prompt=new_prompt_text)
-    )
-    await session.execute(stmt)
+    # Most calls follow a chat turn that changed nothing the prompt shows.
+    if new_prompt_text != stored_prompt:
+        stmt = (
+            update(User)
+            .where(User.id == user_id)
+            .values(personal_prompt=new_prompt_text)
+        )
+        await session.execute(stmt)
     await session.commit()
 
+
+def schedule_personalization_refresh(
+    user_id: int, delay: float = PERSONALIZATION_REFRESH_DELAY_SECONDS
+) -> None:
+    """Rebuild the user's personalized prompt in the background after delay seconds.
+
+    Calls made while a rebuild is waiting are absorbed by it; a call that
+    arrives while the rebuild is running queues one more pass, so the user
+    never has two rebuilds in flight.
+    """
+    _refresh_requested.add(user_id)
+    if user_id in _pending_refreshes:
+        return
+    task = asyncio.create_task(_refresh_after(user_id, delay))
+    _pending_refreshes[user_id] = task
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+
+
+async def drain_personalization_refreshes() -> None:
+    """Run every queued rebuild now and wait for it (call on shutdown)."""
+    _refresh_drain.set()
+    await asyncio.gather(*_refresh_tasks, return_exceptions=True)
+
+
+async def _refresh_after(user_id: int, delay: float) -> None:
+    try:
+        while user_id in _refresh_requested:
+            if not _refresh_drain.is_set():
+                try:
+                    await asyncio.wait_for(_refresh_drain.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+            _refresh_requested.discard(user_id)
+            try:
+                async with async_session_factory() as session:
+                    await update_personalized_prompt_from_all_answers(session, user_id)
+            except Exception:
+                logger.exception(f"Personalized prompt refresh failed for user {user_id}")
+    finally:
+        _pending_refreshes.pop(user_id, None)
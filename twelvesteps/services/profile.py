@@ -1,7 +1,8 @@
 from typing import List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from repositories.ProfileRepository import ProfileRepository
+from db.cache import cache_get, cache_set, invalidation_pending
+from repositories.ProfileRepository import ProfileRepository, sections_cache_key
 from db.models import (
     ProfileSection,
     ProfileSectionData,
@@ -10,15 +11,61 @@ from db.models import (
 )
 from llm.openai_provider import OpenAI
 
+# Standard sections and questions are seeded outside the app (migrations,
+# init_profile_sections), so nothing invalidates the cache when they change;
+# a short TTL bounds how long such edits stay invisible. Custom section
+# writes invalidate their user's key on commit.
+SECTIONS_CACHE_TTL = 300
+
+
+def _question_to_dict(question: ProfileQuestion) -> dict:
+    return {
+        "id": question.id,
+        "section_id": question.section_id,
+        "question_text": question.question_text,
+        "order_index": question.order_index,
+        "is_optional": question.is_optional,
+        "created_at": question.created_at,
+    }
+
+
+def _section_to_dict(section: ProfileSection) -> dict:
+    return {
+        "id": section.id,
+        "name": section.name,
+        "icon": section.icon,
+        "is_custom": section.is_custom,
+        "user_id": section.user_id,
+        "order_index": section.order_index,
+        "created_at": section.created_at,
+        "updated_at": section.updated_at,
+        "questions": [_question_to_dict(q) for q in section.questions],
+    }
+
 
 class ProfileService:
     def __init__(self, session: AsyncSession):
         self.repo = ProfileRepository(session)
         self.session = session
 
-    async def get_all_sections(self, user_id: Optional[int] = None) -> List[ProfileSection]:
-        """Get all sections available to user"""
-        return await self.repo.get_all_sections(user_id)
+    async def get_all_sections(self, user_id: Optional[int] = None) -> List[dict]:
+        """Get all sections available to user, with their questions.
+
+        Returned as plain dicts (not ORM objects) so the list can be cached
+        in Redis; timestamps are ISO strings when served from the cache. The
+        cache is bypassed while this session has uncommitted section changes.
+        """
+        cache_key = sections_cache_key(user_id)
+        use_cache = not invalidation_pending(self.session, cache_key)
+        if use_cache:
+            cached = await cache_get(cache_key)
+            if cached is not None:
+                return cached
+
+        sections = [_section_to_dict(s) for s in await self.repo.get_all_sections(user_id)]
+        if use_cache:
+            await cache_set(cache_key, sections, ttl=SECTIONS_CACHE_TTL)
+        return sections
 
     async def get_section_detail(
         self, section_id: int, user_id: Optional[int] = None
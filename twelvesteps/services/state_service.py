@@ -36,10 +36,10 @@ class StateService:
         actions: Optional[List[str]] = None,
         health: Optional[Dict[str, Any]] = None,
     ) -> SessionState:
-        """
+        """Update the provided parts of the daily snapshot, keeping the rest"""
         state = await self.get_or_create_state(user_id)
 
-        current_snapshot = state.daily_snapshot or {}
+        current_snapshot = dict(state.daily_snapshot or {})
 
         if emotions is not None:
             current_snapshot["emotions"] = emotions
@@ -61,7 +61,7 @@ class StateService:
         blocks: List[str],
         merge: bool = True
     ) -> SessionState:
-        """
+        """Set active blocks, or merge them into the current ones when merge=True"""
         state = await self.get_or_create_state(user_id)
 
         if merge and state.active_blocks:
@@ -83,11 +83,9 @@ class StateService:
         """Add a topic to pending_topics"""
         state = await self.get_or_create_state(user_id)
 
-        if not state.pending_topics:
-            state.pending_topics = []
-
-        if topic not in state.pending_topics:
-            state.pending_topics.append(topic)
+        pending_topics = state.pending_topics or []
+        if topic not in pending_topics:
+            state.pending_topics = [*pending_topics, topic]
 
         await self.session.commit()
         await self.session.refresh(state)
@@ -102,7 +100,7 @@ class StateService:
         state = await self.get_or_create_state(user_id)
 
         if state.pending_topics and topic in state.pending_topics:
-            state.pending_topics.remove(topic)
+            state.pending_topics = [t for t in state.pending_topics if t != topic]
 
         await self.session.commit()
         await self.session.refresh(state)
@@ -116,11 +114,9 @@ class StateService:
         """Add a signal to group_signals"""
         state = await self.get_or_create_state(user_id)
 
-        if not state.group_signals:
-            state.group_signals = []
-
-        if signal not in state.group_signals:
-            state.group_signals.append(signal)
+        group_signals = state.group_signals or []
+        if signal not in group_signals:
+            state.group_signals = [*group_signals, signal]
 
         await self.session.commit()
         await self.session.refresh(state)
@@ -135,19 +131,14 @@ class StateService:
         """Add a recent message to the user's session state."""
         state = await self.get_or_create_state(user_id)
 
-        if not state.recent_messages:
-            state.recent_messages = []
-
         message_entry = {
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "text": text,
             "tags": tags or []
         }
 
-        state.recent_messages.append(message_entry)
-
-        if len(state.recent_messages) > 20:
-            state.recent_messages = state.recent_messages[-20:]
+        # Keep the last 20 entries; a new list so the JSON change is flushed.
+        state.recent_messages = [*(state.recent_messages or []), message_entry][-20:]
 
         await self.session.commit()
         await self.session.refresh(state)
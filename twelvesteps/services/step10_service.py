@@ -2,13 +2,15 @@
 from typing import Dict, Any, Optional
 from datetime import date
 from sqlalchemy.ext.asyncio import AsyncSession
-import json
-import aiofiles
+import orjson
 
 from repositories.Step10DailyAnalysisRepository import Step10DailyAnalysisRepository
 from db.models import Step10AnalysisStatus, User
 
 
+_QUESTIONS: Optional[list] = None
+
+
 class Step10Service:
     def __init__(self, session: AsyncSession):
         self.repo = Step10DailyAnalysisRepository(session)
@@ -17,11 +19,14 @@ class Step10Service:
     @staticmethod
     async def load_questions() -> list:
         """Загрузить список из 10 вопросов из JSON файла"""
+        global _QUESTIONS
+        if _QUESTIONS is not None:
+            return _QUESTIONS
         try:
-            async with aiofiles.open("./llm/prompts/step10_questions.json", "r", encoding="utf-8") as f:
-                content = await f.read()
-                data = json.loads(content)
-                return data.get("questions", [])
+            with open("./llm/prompts/step10_questions.json", "rb") as f:
+                data = orjson.loads(f.read())
+            _QUESTIONS = data.get("questions", [])
+            return _QUESTIONS
         except Exception:
             return [
                 {"number": 1, "text": "Где я сегодня почувствовал внутреннее напряжение, тревогу, раздражение, боль?", "subtext": "(Что запомнилось эмоционально?)"},
@@ -171,7 +176,7 @@ class Step10Service:
             "current_question": analysis.current_question,
             "question_data": current_q_data,
             "progress_summary": self.repo.get_progress_summary(analysis),
-            "answers": analysis.answers,
+            "answers": self.repo.get_answers_list(analysis),
             "is_complete": analysis.status == Step10AnalysisStatus.COMPLETED
         }
 
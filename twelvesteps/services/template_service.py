@@ -41,7 +41,6 @@ class TemplateService:
         """Set active template for user. None resets to default (author template)"""
         if template_id is None:
             user.active_template_id = None
-            self.session.add(user)
             await self.session.flush()
             return True
 
@@ -52,7 +51,6 @@ class TemplateService:
         from db.models import TemplateType
         if template.template_type == TemplateType.AUTHOR or template.user_id == user.id:
             user.active_template_id = template_id
-            self.session.add(user)
             await self.session.flush()
             return True
 
@@ -71,7 +69,7 @@ class TemplateService:
     async def start_template_filling(
         self, user_id: int, step_id: int, question_id: int
     ) -> Dict[str, Any]:
-        """
+        """Начать или продолжить заполнение шаблона"""
         progress = await self.progress_repo.get_or_create_progress(
             user_id, step_id, question_id
         )
@@ -98,7 +96,7 @@ class TemplateService:
     async def submit_field_value(
         self, user_id: int, step_id: int, question_id: int, value: str
     ) -> Dict[str, Any]:
-        """
+        """Сохранить значение текущего поля и перейти к следующему"""
         progress = await self.progress_repo.get_active_progress(
             user_id, step_id, question_id
         )
@@ -169,7 +167,7 @@ class TemplateService:
     async def pause_template_filling(
         self, user_id: int, step_id: int, question_id: int
     ) -> Dict[str, Any]:
-        """
+        """Поставить заполнение шаблона на паузу"""
         progress = await self.progress_repo.get_active_progress(
             user_id, step_id, question_id
         )
@@ -191,7 +189,7 @@ class TemplateService:
     async def get_template_progress(
         self, user_id: int, step_id: int, question_id: int
     ) -> Optional[Dict[str, Any]]:
-        """
+        """Получить текущий прогресс заполнения шаблона"""
         progress = await self.progress_repo.get_active_progress(
             user_id, step_id, question_id
         )
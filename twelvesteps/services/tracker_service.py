@@ -53,6 +53,16 @@ class TrackerService:
         await self.session.refresh(summary)
         return summary
 
+    async def bulk_create_or_update_summaries(
+        self,
+        user_id: int,
+        rows: List[Dict[str, Any]],
+    ) -> List[TrackerSummary]:
+        """Create or update summaries for several dates in one statement"""
+        summaries = await self.repo.bulk_create_or_update(user_id, rows)
+        await self.session.commit()
+        return summaries
+
     async def add_to_category(
         self,
         user_id: int,
@@ -60,7 +70,7 @@ class TrackerService:
         value: str,
         summary_date: Optional[date] = None
     ) -> TrackerSummary:
-        """
+        """Append a value to one category of the day's summary (no duplicates)."""
         if summary_date is None:
             summary_date = date.today()
 
@@ -75,8 +85,7 @@ class TrackerService:
         current_list = getattr(summary, category, None) or []
 
         if value not in current_list:
-            current_list.append(value)
-            setattr(summary, category, current_list)
+            setattr(summary, category, [*current_list, value])
 
         await self.session.commit()
         await self.session.refresh(summary)
@@ -88,7 +97,7 @@ class TrackerService:
         data: Dict[str, Any],
         summary_date: Optional[date] = None
     ) -> TrackerSummary:
-        """
+        """Create or update the day's summary from a dict of category lists."""
         if summary_date is None:
             summary_date = date.today()
 
@@ -127,8 +136,6 @@ class TrackerService:
         end_date: date
     ) -> Dict[str, List[str]]:
         """Aggregate tracker data by category for a period."""
-        summaries = await self.repo.get_summaries_for_period(user_id, start_date, end_date)
-
         result: Dict[str, List[str]] = {
             "thinking": [],
             "feeling": [],
@@ -137,7 +144,7 @@ class TrackerService:
             "health": []
         }
 
-        for summary in summaries:
+        async for summary in self.repo.iter_summaries_for_period(user_id, start_date, end_date):
             for category in result.keys():
                 values = getattr(summary, category, None) or []
                 for value in values:
@@ -154,8 +161,6 @@ class TrackerService:
         """Get trend data for a user over a period of days."""
         end = date.today()
         start = end - timedelta(days=days)
-        summaries = await self.repo.get_summaries_for_period(user_id, start, end)
-
         from collections import Counter
         category_counters: Dict[str, Counter] = {
             "thinking": Counter(),
@@ -166,7 +171,7 @@ class TrackerService:
         }
 
         daily_counts = []
-        for summary in summaries:
+        async for summary in self.repo.iter_summaries_for_period(user_id, start, end):
             day_count = 0
             for category in category_counters.keys():
                 values = getattr(summary, category, None) or []
@@ -190,7 +195,7 @@ class TrackerService:
 
         return {
             "period_days": days,
-            "summaries_count": len(summaries),
+            "summaries_count": len(daily_counts),
             "most_common": most_common,
             "daily_counts": daily_counts,
             "categories_filled": categories_filled
@@ -148,3 +148,33 @@ class VectorStoreService:
             ids=[chunk_id]
         )
 
+    def upsert_core_chunks_bulk(
+        self,
+        chunk_ids: List[str],
+        contents: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[Dict[str, Any]]
+    ) -> None:
+        """Insert or overwrite many chunks in the GPT-SELF core collection in a single call."""
+        if not chunk_ids:
+            return
+        self.core_collection.upsert(
+            embeddings=embeddings,
+            documents=contents,
+            metadatas=metadatas,
+            ids=chunk_ids
+        )
+
+    def delete_core_chunks_except(self, keep_ids: List[str]) -> int:
+        """Delete core chunks whose ids are not in keep_ids; returns how many were removed."""
+        if self.core_collection.count() <= len(keep_ids):
+            return 0
+        keep = set(keep_ids)
+        stale = [
+            chunk_id for chunk_id in self.core_collection.get(include=[])["ids"]
+            if chunk_id not in keep
+        ]
+        if stale:
+            self.core_collection.delete(ids=stale)
+        return len(stale)
+